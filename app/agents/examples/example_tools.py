@@ -2,6 +2,10 @@ from pydantic import BaseModel
 from app.agents.tools.base import BaseTool
 from app.agents.models import CallbackContext
 import asyncio
+import os
+
+# Simulated search latency; the test suite sets it to 0
+DUMMY_SLEEP_SECONDS = float(os.getenv("DUMMY_SLEEP_SECONDS", "5"))
 
 
 class DummySearchTool(BaseTool):
@@ -14,7 +18,7 @@ class DummySearchTool(BaseTool):
 	input_schema = Input
 
 	async def run(self, context: CallbackContext, query: str):
-		await asyncio.sleep(5)  # Simulate a delay
+		await asyncio.sleep(DUMMY_SLEEP_SECONDS)  # Simulate a delay
 		return (
 			f"Results for '{query}': Found 3 documents related to this topic."
 		)
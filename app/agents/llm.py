@@ -112,7 +112,7 @@ class LLM:
 
 		except Exception as e:
 			logger.error(f"Error in LLM call: {str(e)}")
-			yield AgentEvent(type="error", content=str(e))
+			yield AgentEvent.emit(type="error", content=str(e))
 			return
 
 		logger.info("Received response from OpenAI LLM.")
@@ -142,7 +142,7 @@ class LLM:
 				yield event
 
 		if context.llm_result is None:
-			yield AgentEvent(
+			yield AgentEvent.emit(
 				type="error", content="LLM call failed without result"
 			)
 			return
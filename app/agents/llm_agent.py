@@ -101,27 +101,32 @@ class LLMAgent(BaseAgent):
 
 			# If there's content with tool calls, it's a "thought"
 			if content:
-				yield AgentEvent(type="thought", content=content)
-
-			# Execute each tool call
-			for tool_call in tool_calls:
-				logger.info(f"Executing tool: {tool_call.function.name}")
-
-				# New context for each tool - avoid race conditions
-				tool_context: CallbackContext = CallbackContext()
-
-				tool = self.get_tool(tool_call.function.name)
-
-				# Execute tool (with callbacks)
-				async for event in tool.execute(tool_call, tool_context):
-					yield event
-				tool_result = tool_context.tool_result
+				yield AgentEvent.emit(type="thought", content=content)
+
+			# Execute tool calls concurrently, events stay in call order
+			# New context for each tool - avoid race conditions
+			calls = [
+				(
+					self.get_tool(tool_call.function.name),
+					tool_call,
+					CallbackContext(),
+				)
+				for tool_call in tool_calls
+			]
+			logger.info(
+				"Executing tools: "
+				f"{[tool_call.function.name for tool_call in tool_calls]}"
+			)
+
+			async for event in BaseTool.execute_many(calls):
+				yield event
 
+			for _, tool_call, tool_context in calls:
 				messages.append(
 					BaseTool.build_tool_result_message(
 						tool_call.id,
 						tool_call.function.name,
-						tool_result
+						tool_context.tool_result
 						or "Error: Tool failed without returning a result.",
 					)
 				)
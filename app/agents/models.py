@@ -23,6 +23,16 @@ class AgentEvent(BaseModel):
 	tool_call_id: Optional[str] = None
 	callback_type: Optional[str] = None
 
+	@classmethod
+	def emit(cls, type: str, content: str, **kwargs: Any) -> "AgentEvent":
+		"""
+		Build an event without running validation.
+		Only for events assembled internally from values of known type;
+		anything derived from tool or callback output goes through the
+		regular constructor.
+		"""
+		return cls.model_construct(type=type, content=content, **kwargs)
+
 
 class CitationItem(BaseModel):
 	"""
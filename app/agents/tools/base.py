@@ -1,6 +1,16 @@
 from abc import ABC, abstractmethod
-from pydantic import BaseModel
-from typing import Any, Type, Dict, Optional, AsyncIterator
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import from_json
+from typing import (
+	Any,
+	AsyncIterator,
+	Callable,
+	ClassVar,
+	Dict,
+	Optional,
+	Type,
+)
+import asyncio
 import json
 import inspect
 
@@ -15,6 +25,9 @@ from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Attributes the per-class caches are built from
+_DEFINITION_ATTRS = frozenset({"name", "description", "input_schema"})
+
 
 # ============================================================
 # BASE TOOL
@@ -26,6 +39,31 @@ class BaseTool(ABC):
 	description: str = "A base tool"
 	input_schema: Type[BaseModel] = None
 
+	# Per-class caches, built from class attributes. Instances that set their
+	# own name, description or input_schema bypass them (see _overrides).
+	_schema: ClassVar[Optional[Dict]] = None
+	_openai_tool: ClassVar[Optional[dict]] = None
+	_validator: ClassVar[Optional[Callable[[Any], BaseModel]]] = None
+	# Shape of `run()`, inspected once per class instead of per call
+	_run_accepts_context: ClassVar[bool] = False
+	_run_is_streaming: ClassVar[bool] = False
+
+	def __init_subclass__(cls, **kwargs):
+		super().__init_subclass__(**kwargs)
+		cls._schema = None
+		cls._openai_tool = None
+		cls._validator = (
+			TypeAdapter(cls.input_schema).validate_python
+			if cls.input_schema
+			else None
+		)
+
+		params = inspect.signature(cls.run).parameters
+		cls._run_accepts_context = "context" in params or any(
+			p.kind == inspect.Parameter.VAR_KEYWORD for p in params.values()
+		)
+		cls._run_is_streaming = inspect.isasyncgenfunction(cls.run)
+
 	def __init__(
 		self,
 		before_tool_callback: Optional[BeforeToolCallback] = None,
@@ -38,22 +76,48 @@ class BaseTool(ABC):
 	# Tool helpers
 	# ============================================================
 
+	def _overrides(self, *attrs: str) -> bool:
+		"""Whether the instance sets any of `attrs` itself (not the class)."""
+		return not vars(self).keys().isdisjoint(attrs)
+
 	@property
 	def schema(self) -> Dict:
-		"""Returns the JSON schema for the tool input"""
-		if self.input_schema:
-			return self.input_schema.model_json_schema()
-		return {}
+		"""Returns the JSON schema for the tool input (computed once per class)"""
+		if self._overrides("input_schema"):
+			return (
+				self.input_schema.model_json_schema()
+				if self.input_schema
+				else {}
+			)
+		cls = type(self)
+		if cls._schema is None:
+			cls._schema = (
+				cls.input_schema.model_json_schema() if cls.input_schema else {}
+			)
+		return cls._schema
 
 	def to_openai_tool(self) -> dict:
-		return {
-			"type": "function",
-			"function": {
-				"name": self.name,
-				"description": self.description,
-				"parameters": self.schema,
-			},
-		}
+		"""Returns the OpenAI tool definition (computed once per class)"""
+		if self._overrides(*_DEFINITION_ATTRS):
+			return {
+				"type": "function",
+				"function": {
+					"name": self.name,
+					"description": self.description,
+					"parameters": self.schema,
+				},
+			}
+		cls = type(self)
+		if cls._openai_tool is None:
+			cls._openai_tool = {
+				"type": "function",
+				"function": {
+					"name": cls.name,
+					"description": cls.description,
+					"parameters": self.schema,
+				},
+			}
+		return cls._openai_tool
 
 	@staticmethod
 	def parse_tool_args(raw_args: str | dict | None) -> dict:
@@ -62,8 +126,8 @@ class BaseTool(ABC):
 		if isinstance(raw_args, dict):
 			return raw_args
 		try:
-			return json.loads(raw_args)
-		except json.JSONDecodeError:
+			return from_json(raw_args)
+		except ValueError:
 			return {}
 
 	@staticmethod
@@ -92,14 +156,7 @@ class BaseTool(ABC):
 		Some tools (including tests) implement `run(self, **args)` without a
 		`context` parameter. Newer tools may accept `context` explicitly.
 		"""
-		sig = inspect.signature(self.run)
-		params = sig.parameters
-		accepts_kwargs = any(
-			p.kind == inspect.Parameter.VAR_KEYWORD for p in params.values()
-		)
-		accepts_context = "context" in params or accepts_kwargs
-
-		if accepts_context:
+		if self._run_accepts_context:
 			return self.run(context=context, **effective_args)
 		return self.run(**effective_args)
 
@@ -129,10 +186,20 @@ class BaseTool(ABC):
 				f"dict, got {type(effective_args).__name__}."
 			)
 			context.tool_result = error_msg
-			yield AgentEvent(type="error", content=error_msg)
+			yield AgentEvent.emit(type="error", content=error_msg)
 			return
 
 		try:
+			validator = self._validator
+			if self._overrides("input_schema"):
+				validator = (
+					TypeAdapter(self.input_schema).validate_python
+					if self.input_schema
+					else None
+				)
+			if validator is not None:
+				effective_args = dict(validator(effective_args))
+
 			logger.info(
 				f"Running tool '{self.name}' with args: {effective_args}"
 			)
@@ -141,15 +208,14 @@ class BaseTool(ABC):
 				context=context, effective_args=effective_args
 			)
 
-			# Case 1: async generator
-			if inspect.isasyncgen(result):
+			# Case 1: async generator (streams its own events)
+			if self._run_is_streaming or inspect.isasyncgen(result):
 				async for event in result:
 					yield event
 
 			# Case 2: awaitable function
 			elif inspect.isawaitable(result):
-				result = await result
-				context.tool_result = str(result)
+				context.tool_result = str(await result)
 
 			else:
 				# Error: Tool .run() returned an invalid result type
@@ -165,7 +231,7 @@ class BaseTool(ABC):
 
 		except Exception as e:
 			context.tool_result = f"{type(e).__name__}: {e}"
-			yield AgentEvent(
+			yield AgentEvent.emit(
 				type="error",
 				content=context.tool_result,
 				tool_name=self.name,
@@ -265,6 +331,58 @@ class BaseTool(ABC):
 			tool_call_id=tool_call.id,
 		)
 
+	@staticmethod
+	async def execute_many(
+		calls: list[
+			tuple["BaseTool", ChatCompletionMessageToolCall, CallbackContext]
+		],
+	) -> AsyncIterator[AgentEvent]:
+		"""
+		Executes a batch of tool calls concurrently.
+
+		Every call runs in its own task, but events are yielded grouped per
+		call and in input order: the first call streams live, later calls
+		are buffered until their turn. Each call's result ends up in its own
+		context, exactly as with `execute`.
+
+		Args:
+		    calls: (tool, tool_call, context) triples, one per tool call.
+
+		Yields:
+		    AgentEvent: Events of all calls, in input order.
+		"""
+		if len(calls) == 1:
+			tool, tool_call, context = calls[0]
+			async for event in tool.execute(tool_call, context):
+				yield event
+			return
+
+		done = object()
+
+		async def drain(tool, tool_call, context, queue):
+			try:
+				async for event in tool.execute(tool_call, context):
+					queue.put_nowait(event)
+			except Exception as e:
+				queue.put_nowait(e)
+			finally:
+				queue.put_nowait(done)
+
+		queues = [asyncio.Queue() for _ in calls]
+		tasks = [
+			asyncio.create_task(drain(*call, queue))
+			for call, queue in zip(calls, queues)
+		]
+		try:
+			for queue in queues:
+				while (item := await queue.get()) is not done:
+					if isinstance(item, Exception):
+						raise item
+					yield item
+		finally:
+			for task in tasks:
+				task.cancel()
+
 	@abstractmethod
 	async def run(self, **kwargs) -> Any:
 		"""Execute the tool logic"""
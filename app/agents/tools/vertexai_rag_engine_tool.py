@@ -181,22 +181,23 @@ class VertexAIRagEngineTool(BaseTool):
 		results = await client.retrieve_contexts(query, similarity_top_k=3)
 		context.tool_result = str(results)
 
-		storage_service = get_storage_service()
+		sources = [item for item in results if item.get("source_uri")]
+		# Signed on the storage service's pool, off the event loop
+		urls = await get_storage_service().sign_urls(
+			[item["source_uri"] for item in sources]
+		)
 
 		citations = [
 			CitationItem(
 				source_type="pdf",
 				title=item.get("source_name"),
-				url=storage_service.generate_signed_url(
-					item.get("source_uri"), expiration=1800
-				),
+				url=url,
 				text=item.get("text"),
 				page_span_start=item.get("page_span", {}).get("firstPage"),
 				page_span_end=item.get("page_span", {}).get("lastPage"),
 				gcs_path=item.get("source_uri"),
 			)
-			for item in results
-			if item.get("source_uri")
+			for item, url in zip(sources, urls)
 		]
 		logger.info(f"Citations: {[c.model_dump() for c in citations]}")
 
@@ -1,16 +1,20 @@
 from fastapi import Depends
 from app.core.database import get_db, AsyncSession
 from app.services.storage_service import StorageService, get_storage_service
-from app.services.chat_service import ChatService
+from app.services.chat_service import ChatService, get_agents
+from app.agents.base import BaseAgent
 from typing import Annotated
 
 
 StorageServiceDep = Annotated[StorageService, Depends(get_storage_service)]
+AgentsDep = Annotated[dict[str, BaseAgent], Depends(get_agents)]
 
 
-def get_chat_service(db: AsyncSession = Depends(get_db)) -> ChatService:
+def get_chat_service(
+	agents: AgentsDep, db: AsyncSession = Depends(get_db)
+) -> ChatService:
 	"""Function dependency to get ChatService instance."""
-	return ChatService(db)
+	return ChatService(db, agents)
 
 
 ChatServiceDep = Annotated[ChatService, Depends(get_chat_service)]
@@ -1,28 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import StreamingResponse
-from typing import List
+from typing import Any, Coroutine, List, Optional
+from datetime import datetime
 
 from app.core.database import get_db
 from app.services.chat_service import (
 	ChatService,
 	update_conversation_title,
-	AGENTS,
 )
 from app.schemas.chat import (
 	Conversation,
 	ConversationCreate,
 	ConversationDetail,
+	ConversationListItem,
 	ChatRequest,
 	AgentInfo,
 )
 from app.core.logging import get_logger
-from app.api.dependencies import StorageServiceDep, ChatServiceDep
+from app.api.dependencies import (
+	AgentsDep,
+	StorageServiceDep,
+	ChatServiceDep,
+)
 
 
 router = APIRouter()
 logger = get_logger(__name__)
 
+# Strong references to fire-and-forget tasks so they are not garbage collected
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _spawn_background(coro: Coroutine[Any, Any, Any]) -> None:
+	"""Run a coroutine detached from the request, logging any failure."""
+	task = asyncio.create_task(coro)
+	_background_tasks.add(task)
+
+	def _done(t: asyncio.Task) -> None:
+		_background_tasks.discard(t)
+		if not t.cancelled() and t.exception() is not None:
+			logger.error(f"Background task failed: {t.exception()}")
+
+	task.add_done_callback(_done)
+
 
 @router.post("/conversations", response_model=Conversation)
 async def create_conversation(
@@ -32,18 +54,26 @@ async def create_conversation(
 	return await service.create_conversation(title=conv_in.title)
 
 
-@router.get("/conversations", response_model=List[Conversation])
+@router.get("/conversations", response_model=List[ConversationListItem])
 async def list_conversations(
-	limit: int = 20, db: AsyncSession = Depends(get_db)
-) -> List[Conversation]:
+	limit: int = 20,
+	before: Optional[datetime] = None,
+	before_id: Optional[str] = None,
+	db: AsyncSession = Depends(get_db),
+) -> List[ConversationListItem]:
 	service = ChatService(db)
-	return await service.get_conversations(limit=limit)
+	rows = await service.get_conversations_list(
+		limit=limit, before=before, before_id=before_id
+	)
+	return [
+		ConversationListItem.model_construct(**row._mapping) for row in rows
+	]
 
 
 @router.get("/agents", response_model=List[AgentInfo])
-async def list_agents() -> List[AgentInfo]:
+async def list_agents(agents: AgentsDep) -> List[AgentInfo]:
 	agents_list = []
-	for agent_id, agent in AGENTS.items():
+	for agent_id, agent in agents.items():
 		agents_list.append(
 			AgentInfo(
 				id=agent_id,
@@ -89,19 +119,17 @@ async def delete_conversation(
 async def send_message(
 	conversation_id: str,
 	request: ChatRequest,
-	background_tasks: BackgroundTasks,
-	db: AsyncSession = Depends(get_db),
+	service: ChatServiceDep,
 ) -> StreamingResponse:
-	service = ChatService(db)
 	conv = await service.get_conversation(conversation_id)
 	if not conv:
 		raise HTTPException(status_code=404, detail="Conversation not found")
 
+	# Title generation runs concurrently with the agent turn instead of
+	# after the response, so a slow LLM call never holds up the stream.
 	if conv.title == "New Chat":
-		background_tasks.add_task(
-			update_conversation_title,
-			conversation_id,
-			request.content,
+		_spawn_background(
+			update_conversation_title(conversation_id, request.content)
 		)
 
 	return StreamingResponse(
@@ -1,3 +1,4 @@
+import json
 import logging
 from logging import LogRecord
 from uvicorn.logging import DefaultFormatter
@@ -25,6 +26,12 @@ LEVEL_COLORS = {
 	"CRITICAL": Ansi.RED + Ansi.BOLD,
 }
 
+# Pre-rendered colored level names, so formatting a record is one dict lookup
+LEVEL_LABELS = {
+	level: f"{color}{level}{Ansi.RESET}"
+	for level, color in LEVEL_COLORS.items()
+}
+
 
 def color_status(status: int) -> str:
 	if 200 <= status < 300:
@@ -39,23 +46,22 @@ def color_status(status: int) -> str:
 class CustomDefaultFormatter(DefaultFormatter):
 	def format(self, record):
 		if settings.LOG_MODE == "json":
-			log_record = {
-				"time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
-				"severity": record.levelname,
-				"logger": record.name,
-				"message": record.getMessage(),
-			}
-
-		else:
-			color = LEVEL_COLORS.get(record.levelname, "")
-			log_record = (
-				f"{color}{record.levelname}{Ansi.RESET} | "
-				f"{self.formatTime(record, '%Y-%m-%d %H:%M:%S')} | "
-				f"{Ansi.BLUE}{record.name}{Ansi.RESET} | "
-				f"{record.getMessage()}"
+			return json.dumps(
+				{
+					"time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+					"severity": record.levelname,
+					"logger": record.name,
+					"message": record.getMessage(),
+				}
 			)
 
-		return str(log_record)
+		level = LEVEL_LABELS.get(record.levelname, record.levelname)
+		return (
+			f"{level} | "
+			f"{self.formatTime(record, '%Y-%m-%d %H:%M:%S')} | "
+			f"{Ansi.BLUE}{record.name}{Ansi.RESET} | "
+			f"{record.getMessage()}"
+		)
 
 
 class CustomAccessFormatter(DefaultFormatter):
@@ -63,7 +69,7 @@ class CustomAccessFormatter(DefaultFormatter):
 
 	def format(self, record: LogRecord) -> str:
 		if settings.LOG_MODE == "json":
-			return str(
+			return json.dumps(
 				{
 					"severity": record.levelname,
 					"time": self.formatTime(record, "%Y-%m-%d %H:%M:%S"),
@@ -75,11 +81,11 @@ class CustomAccessFormatter(DefaultFormatter):
 		message = record.getMessage()
 
 		# --- color severity ---
-		level_color = LEVEL_COLORS.get(record.levelname, "")
-		level = f"{level_color}{record.levelname}{Ansi.RESET}"
+		level = LEVEL_LABELS.get(record.levelname, record.levelname)
 
 		# --- bold request + color status ---
-		match = self._request_re.search(message)
+		# Access lines without a quoted request line cannot match, skip regex
+		match = '"' in message and self._request_re.search(message)
 		if match:
 			request, status = match.groups()
 			status_colored = color_status(int(status))
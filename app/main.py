@@ -7,6 +7,8 @@ from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.core.database import engine, Base
 from app.api.routers import chat
+from app.services.chat_service import close_title_client
+from app.services.storage_service import close_storage_service
 
 
 @asynccontextmanager
@@ -15,7 +17,8 @@ async def lifespan(app: FastAPI):
 	async with engine.begin() as conn:
 		await conn.run_sync(Base.metadata.create_all)
 	yield
-	pass
+	await close_title_client()
+	close_storage_service()
 
 
 app = FastAPI(
@@ -8,13 +8,25 @@ from sqlalchemy import (
 	Text,
 	Integer,
 	JSON,
+	Index,
+	func,
 )
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import relationship
 import enum
 
 from app.core.database import Base
 
 
+# Primary / foreign key type: UUID strings in Python everywhere, stored as a
+# native 16-byte UUID on Postgres and as text elsewhere (SQLite has no UUID).
+ID = String().with_variant(postgresql.UUID(as_uuid=False), "postgresql")
+
+
+def _new_id() -> str:
+	return str(uuid.uuid4())
+
+
 class MessageRole(str, enum.Enum):
 	USER = "user"
 	ASSISTANT = "assistant"
@@ -31,11 +43,13 @@ class TraceType(str, enum.Enum):
 class Conversation(Base):
 	__tablename__ = "conversations"
 
-	id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+	id = Column(ID, primary_key=True, default=_new_id)
 	title = Column(String, nullable=True)
-	created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+	created_at = Column(
+		DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+	)
 	updated_at = Column(
-		DateTime,
+		DateTime(timezone=True),
 		default=lambda: datetime.now(timezone.utc),
 		onupdate=lambda: datetime.now(timezone.utc),
 	)
@@ -47,15 +61,22 @@ class Conversation(Base):
 		cascade="all, delete-orphan",
 	)
 
+	# Serves the sidebar listing (newest first) and its keyset pagination
+	__table_args__ = (
+		Index("ix_conversations_updated_id", updated_at.desc(), id.desc()),
+	)
+
 
 class Message(Base):
 	__tablename__ = "messages"
 
-	id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-	conversation_id = Column(String, ForeignKey("conversations.id"))
+	id = Column(ID, primary_key=True, default=_new_id)
+	conversation_id = Column(ID, ForeignKey("conversations.id"))
 	role = Column(String, nullable=False)  # user, assistant, system
 	content = Column(Text, nullable=True)  # Final message content
-	created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+	created_at = Column(
+		DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+	)
 
 	# Metadata for metrics
 	meta_data = Column(JSON, default={})
@@ -65,9 +86,15 @@ class Message(Base):
 		"TraceLog",
 		back_populates="message",
 		cascade="all, delete-orphan",
+		order_by="TraceLog.timestamp",
 	)
 	feedback = relationship("Feedback", back_populates="message", uselist=False)
 
+	# History reads filter by conversation and sort by creation time
+	__table_args__ = (
+		Index("ix_messages_conv_created", conversation_id, created_at),
+	)
+
 
 class TraceLog(Base):
 	"""
@@ -77,14 +104,17 @@ class TraceLog(Base):
 
 	__tablename__ = "trace_logs"
 
-	id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-	message_id = Column(String, ForeignKey("messages.id"))
+	id = Column(ID, primary_key=True, default=_new_id)
+	message_id = Column(ID, ForeignKey("messages.id"))
 	type = Column(String, nullable=False)  # thought, tool_call, tool_result
 	content = Column(Text, nullable=True)  # The thought text or tool output
 	tool_name = Column(String, nullable=True)
 	tool_call_id = Column(String, nullable=True)
-	tool_args = Column(JSON, nullable=True)
-	timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+	# JSON-encoded arguments, stored in the string form OpenAI expects
+	tool_args = Column(Text, nullable=True)
+	timestamp = Column(
+		DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+	)
 
 	message = relationship("Message", back_populates="traces")
 	citations = relationship(
@@ -93,12 +123,15 @@ class TraceLog(Base):
 		cascade="all, delete-orphan",
 	)
 
+	# Traces are loaded per message in chronological order
+	__table_args__ = (Index("ix_tracelogs_msg_ts", message_id, timestamp),)
+
 
 class Citation(Base):
 	__tablename__ = "citations"
 
-	id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-	trace_id = Column(String, ForeignKey("trace_logs.id"), nullable=False)
+	id = Column(ID, primary_key=True, default=_new_id)
+	trace_id = Column(ID, ForeignKey("trace_logs.id"), nullable=False)
 	source_type = Column(String, nullable=False)
 
 	title = Column(String, nullable=False)
@@ -109,7 +142,7 @@ class Citation(Base):
 	gcs_path = Column(String, nullable=True)
 	source_metadata = Column(JSON, default={})
 
-	created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+	created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 	trace = relationship("TraceLog", back_populates="citations")
 
@@ -117,10 +150,10 @@ class Citation(Base):
 class Feedback(Base):
 	__tablename__ = "feedback"
 
-	id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-	message_id = Column(String, ForeignKey("messages.id"))
+	id = Column(ID, primary_key=True, default=_new_id)
+	message_id = Column(ID, ForeignKey("messages.id"))
 	rating = Column(Integer)  # 1 or -1
 	comment = Column(Text, nullable=True)
-	created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+	created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 	message = relationship("Message", back_populates="feedback")
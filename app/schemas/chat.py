@@ -1,5 +1,7 @@
 import json
-from pydantic import BaseModel, Field, field_validator
+from functools import cached_property
+from pydantic import BaseModel, Field, computed_field, field_validator
+from pydantic_core import from_json
 from pydantic_settings import SettingsConfigDict
 from typing import List, Optional, Any, Dict
 from datetime import datetime
@@ -23,6 +25,14 @@ class Conversation(ConversationBase):
 	model_config = SettingsConfigDict(from_attributes=True)
 
 
+class ConversationListItem(ConversationBase):
+	"""Narrow conversation shape for the sidebar list."""
+
+	id: str
+	updated_at: datetime
+	status: str
+
+
 # --- Trace/Step Schemas ---
 class Citation(BaseModel):
 	id: str
@@ -70,9 +80,35 @@ class TraceLogBase(BaseModel):
 	type: str
 	content: Optional[str] = None
 	tool_name: Optional[str] = None
-	tool_args: Optional[Dict[str, Any]] = None
+	# Tool arguments are stored as a JSON string (OpenAI wire format) and kept
+	# raw on load; they are only decoded when `tool_args` is read/serialized.
+	tool_args_raw: Optional[str] = Field(
+		default=None, validation_alias="tool_args", exclude=True
+	)
 	citations: List[Citation] = Field(default_factory=list)
 
+	@field_validator("tool_args_raw", mode="before")
+	@classmethod
+	def _encode_tool_args(cls, v: Any) -> Optional[str]:
+		if v is None or isinstance(v, str):
+			return v
+		return json.dumps(v)
+
+	@computed_field
+	@cached_property
+	def tool_args(self) -> Optional[Dict[str, Any]]:
+		"""
+		Decoded tool arguments, exposed to API clients as an object. Rows that
+		don't hold a JSON object (malformed or legacy data) read as None.
+		"""
+		if not self.tool_args_raw or not self.tool_args_raw.strip():
+			return None
+		try:
+			args = from_json(self.tool_args_raw)
+		except ValueError:
+			return None
+		return args if isinstance(args, dict) else None
+
 
 class TraceLog(TraceLogBase):
 	id: str
@@ -42,5 +42,27 @@ class OpenAIChatMessage(BaseModel):
 		"""
 		Dump to the dict shape expected by OpenAI's chat.completions API,
 		excluding None fields.
+
+		Built by hand from the known fields rather than via `model_dump`,
+		this runs for every message on every history rebuild.
 		"""
-		return self.model_dump(exclude_none=True)
+		out: Dict[str, Any] = {"role": self.role}
+		if self.content is not None:
+			out["content"] = self.content
+		if self.tool_call_id is not None:
+			out["tool_call_id"] = self.tool_call_id
+		if self.name is not None:
+			out["name"] = self.name
+		if self.tool_calls is not None:
+			out["tool_calls"] = [
+				{
+					"id": tc.id,
+					"type": tc.type,
+					"function": {
+						"name": tc.function.name,
+						"arguments": tc.function.arguments,
+					},
+				}
+				for tc in self.tool_calls
+			]
+		return out
@@ -1,8 +1,12 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from typing import AsyncGenerator
-import json
+from sqlalchemy import Select, bindparam, select, tuple_, update
+from sqlalchemy.orm import raiseload, selectinload
+import asyncio
+import io
+import anyio
+from functools import lru_cache
+from typing import AsyncGenerator, AsyncIterator, Optional
+from datetime import datetime, timedelta, timezone
 
 from app.models.chat import (
 	Conversation,
@@ -15,17 +19,85 @@ from app.core.config import settings
 from app.core.database import SessionLocal
 from openai import AsyncOpenAI
 from app.services.memory_service import MemoryService
+from app.services.storage_service import get_storage_service
 from app.agents.base import BaseAgent
+from app.agents.models import AgentEvent, CitationEvent
 from app.core.logging import get_logger
 
 
 logger = get_logger(__name__)
 
+# Built once at import; get_conversation only binds the id per call.
+_GET_CONVERSATION_STMT = (
+	select(Conversation)
+	.options(
+		selectinload(Conversation.messages)
+		.selectinload(Message.traces)
+		.selectinload(TraceLog.citations),
+		raiseload("*"),
+	)
+	.where(Conversation.id == bindparam("conversation_id"))
+)
+
+# Events the agent may run ahead of the HTTP stream before it has to wait.
+STREAM_QUEUE_SIZE = 64
+_STREAM_DONE = object()
+
+
+async def _drain_events(
+	events: AsyncIterator[AgentEvent], queue: asyncio.Queue
+) -> None:
+	"""
+	Producer side of the event stream: pushes agent events into `queue`,
+	then `_STREAM_DONE` (or the exception the agent raised).
+	"""
+	try:
+		async for event in events:
+			await queue.put(event)
+	except Exception as e:
+		await queue.put(e)
+		return
+	await queue.put(_STREAM_DONE)
+
+
+def _next_trace_time(previous: list[datetime]) -> datetime:
+	"""
+	Current time for a buffered trace, nudged past the previous one if both
+	land on the same clock tick, so traces keep their order when loaded.
+	"""
+	now = datetime.now(timezone.utc)
+	if previous and now <= previous[-1]:
+		return previous[-1] + timedelta(microseconds=1)
+	return now
+
+
+def get_agents() -> dict[str, BaseAgent]:
+	"""Dependency returning the agent registry (overridable in tests)."""
+	return AGENTS
+
+
+@lru_cache()
+def get_title_client() -> AsyncOpenAI:
+	"""Shared OpenAI client for title generation (reuses its connection pool)."""
+	return AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+
+async def close_title_client() -> None:
+	"""Close the title client on shutdown, if it was ever created."""
+	if get_title_client.cache_info().currsize:
+		await get_title_client().close()
+		get_title_client.cache_clear()
+
 
 class ChatService:
-	def __init__(self, db: AsyncSession):
+	def __init__(
+		self,
+		db: AsyncSession,
+		agents: Optional[dict[str, BaseAgent]] = None,
+	):
 		self.db = db
 		self.memory = MemoryService(db)
+		self.agents = agents if agents is not None else AGENTS
 
 	async def create_conversation(
 		self, title: str = "New Chat"
@@ -38,24 +110,69 @@ class ChatService:
 
 	async def get_conversation(self, conversation_id: str) -> Conversation:
 		result = await self.db.execute(
-			select(Conversation)
-			.options(
-				selectinload(Conversation.messages)
-				.selectinload(Message.traces)
-				.selectinload(TraceLog.citations)
-			)
-			.where(Conversation.id == conversation_id)
+			_GET_CONVERSATION_STMT, {"conversation_id": conversation_id}
 		)
 		return result.scalars().first()
 
-	async def get_conversations(self, limit: int = 20):
+	async def get_conversations(
+		self,
+		limit: int = 20,
+		before: Optional[datetime] = None,
+		before_id: Optional[str] = None,
+	):
+		"""
+		List conversations, most recently updated first.
+
+		Pagination is keyset-based: pass the `updated_at` / `id` of the last
+		conversation of the previous page as `before` / `before_id`.
+		"""
+		stmt = select(Conversation).options(raiseload("*"))
 		result = await self.db.execute(
-			select(Conversation)
-			.order_by(Conversation.updated_at.desc())
-			.limit(limit)
+			self._page_conversations(stmt, limit, before, before_id)
 		)
 		return result.scalars().all()
 
+	async def get_conversations_list(
+		self,
+		limit: int = 20,
+		before: Optional[datetime] = None,
+		before_id: Optional[str] = None,
+	):
+		"""
+		Like `get_conversations`, but selects only the columns the sidebar
+		needs and returns plain rows instead of ORM objects.
+		"""
+		stmt = select(
+			Conversation.id,
+			Conversation.title,
+			Conversation.updated_at,
+			Conversation.status,
+		)
+		result = await self.db.execute(
+			self._page_conversations(stmt, limit, before, before_id)
+		)
+		return result.all()
+
+	@staticmethod
+	def _page_conversations(
+		stmt: Select,
+		limit: int,
+		before: Optional[datetime],
+		before_id: Optional[str],
+	) -> Select:
+		"""Apply keyset pagination and newest-first ordering to a list query."""
+		if before is not None and before_id is not None:
+			stmt = stmt.where(
+				tuple_(Conversation.updated_at, Conversation.id)
+				< (before, before_id)
+			)
+		elif before is not None:
+			stmt = stmt.where(Conversation.updated_at < before)
+
+		return stmt.order_by(
+			Conversation.updated_at.desc(), Conversation.id.desc()
+		).limit(limit)
+
 	async def delete_conversation(self, conversation_id: str) -> bool:
 		result = await self.db.execute(
 			select(Conversation).where(Conversation.id == conversation_id)
@@ -69,62 +186,87 @@ class ChatService:
 
 	async def process_message(
 		self, conversation_id: str, request: ChatRequest
-	) -> AsyncGenerator[str, None]:
+	) -> AsyncGenerator[bytes, None]:
 		"""
 		Orchestrates the message processing:
-		1. Save User Message
+		1. Save User Message & Assistant Placeholder
 		2. Run Agent
-		3. Save Agent Traces & Response
+		3. Save Agent Traces (batched, one commit) & Response
 		4. Yield Sentinel Events for proper frontend Parsing
 		"""
 
-		# 1. Save User Message
-		user_msg = await self.memory.create_user_message(
-			conversation_id=conversation_id, content=request.content
+		# 1. Save User Message and Assistant Placeholder (one commit; the
+		# placeholder is the parent row for the traces)
+		user_msg, assistant_msg = await self.memory.begin_turn(
+			conversation_id=conversation_id, user_content=request.content
 		)
+		assistant_msg_id = assistant_msg.id
 		logger.info(
 			f"Processing message {user_msg.id} in conversation {conversation_id}"
 		)
 
 		# 2. Load Agent
-		agent: BaseAgent = AGENTS.get(request.agent_id, AGENTS["default"])
+		agent: BaseAgent = self.agents.get(
+			request.agent_id, self.agents["default"]
+		)
 
 		logger.info(f"Using agent {agent.name} for message {user_msg.id}")
 
-		# Load History (exclude the message we just created)
+		# 3. Load History (exclude the messages of the current turn)
 		history = await self.memory.get_openai_history(
-			conversation_id, exclude_message_ids={user_msg.id}
-		)
-
-		# 3. Create Assistant Message Placeholder (to link traces)
-		assistant_msg = await self.memory.create_assistant_placeholder(
-			conversation_id=conversation_id
+			conversation_id, exclude_message_ids={user_msg.id, assistant_msg_id}
 		)
-		assistant_msg_id = assistant_msg.id
 
-		final_answer_chunks = []
+		answer_buf = io.StringIO()
+		# Traces are buffered and persisted in one commit once the turn ends,
+		# each with the time it was buffered (not the time of the flush)
+		pending_traces: list[AgentEvent] = []
+		trace_times: list[datetime] = []
 
 		# 4. Stream Agent Events
 		logger.info(f"Starting agent run for message {user_msg.id}")
 
-		async for event in agent.process_turn(history, request.content):
-			if event.type != "answer":
-				logger.info(f"Processing Agent Event: {event.type}")
+		# The agent runs in its own task, so it keeps producing while the
+		# previous events are being written to the client.
+		queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+		producer = asyncio.create_task(
+			_drain_events(agent.process_turn(history, request.content), queue)
+		)
+		try:
+			while (event := await queue.get()) is not _STREAM_DONE:
+				if isinstance(event, Exception):
+					raise event
 
-				await self.memory.append_trace(
-					assistant_message_id=assistant_msg_id, event=event
-				)
+				if event.type != "answer":
+					logger.info(f"Processing Agent Event: {event.type}")
+					pending_traces.append(event)
+					trace_times.append(_next_trace_time(trace_times))
+					if isinstance(event, CitationEvent):
+						# Sign GCS links now, so reloading the chat hits the cache
+						get_storage_service().prewarm_signed_urls(
+							c.gcs_path for c in event.citations
+						)
 
-			if event.type == "answer":
-				final_answer_chunks.append(event.content)
+				if event.type == "answer":
+					answer_buf.write(event.content)
 
-			yield json.dumps(event.model_dump()) + "\n"
+				# Serialized straight to JSON bytes by pydantic-core (no dict
+				# round-trip, and no str to re-encode in the response)
+				yield event.__pydantic_serializer__.to_json(event) + b"\n"
+		finally:
+			producer.cancel()
 
-		# 5. Update Assistant Message with Final Content
-		full_content = "".join(final_answer_chunks)
-		await self.memory.finalize_assistant_message(
-			assistant_message_id=assistant_msg_id, content=full_content
-		)
+			# 5. Persist Traces and Final Content (single transaction). Also
+			# runs when the agent fails or the client disconnects, so the
+			# part of the turn streamed so far is kept. Shielded: on a
+			# disconnect Starlette cancels the task group running this stream.
+			with anyio.CancelScope(shield=True):
+				await self.memory.finalize_assistant_message(
+					assistant_message_id=assistant_msg_id,
+					content=answer_buf.getvalue(),
+					events=pending_traces,
+					timestamps=trace_times,
+				)
 
 
 async def update_conversation_title(conversation_id: str, user_text: str):
@@ -133,7 +275,7 @@ async def update_conversation_title(conversation_id: str, user_text: str):
 	"""
 	try:
 		# 1. Generate Title
-		client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+		client = get_title_client()
 
 		prompt = (
 			"You are a helpful assistant. Generate a short, concise "
@@ -154,17 +296,14 @@ async def update_conversation_title(conversation_id: str, user_text: str):
 		)
 		title = response.choices[0].message.content.strip()
 
-		# 2. Update DB
+		# 2. Update DB (single UPDATE, no need to load the row)
 		async with SessionLocal() as session:
-			# Re-fetch conversation to ensure attached to this session
-			result = await session.execute(
-				select(Conversation).where(Conversation.id == conversation_id)
+			await session.execute(
+				update(Conversation)
+				.where(Conversation.id == conversation_id)
+				.values(title=title)
 			)
-			conv = result.scalars().first()
-			if conv:
-				conv.title = title
-				session.add(conv)
-				await session.commit()
+			await session.commit()
 
 	except Exception as e:
-		print(f"Error generating title: {e}")
+		logger.error(f"Error generating title: {e}")
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import json
-from typing import List, Optional, Sequence, Set
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional, Sequence, Set
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import raiseload, selectinload
 
 from app.agents.models import AgentEvent, CitationEvent
 from app.models.chat import Message, MessageRole, TraceLog, Citation
@@ -19,11 +21,22 @@ from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Built once at import; iter_openai_history only binds the conversation id.
+_FETCH_MESSAGES_STMT = (
+	select(Message)
+	.options(selectinload(Message.traces), raiseload("*"))
+	.where(Message.conversation_id == bindparam("conversation_id"))
+	.order_by(Message.created_at)
+)
+
 
 class MemoryService:
 	"""
 	Single-responsibility service for translating DB chat state into OpenAI
 	`messages` and persisting agent traces / outputs back into the DB.
+
+	Rows read from our own DB are trusted, so OpenAI message models are built
+	with `model_construct` (no validation pass).
 	"""
 
 	def __init__(self, db: AsyncSession):
@@ -43,46 +56,49 @@ class MemoryService:
 		Build OpenAI-compatible `messages` for the conversation so the agent can run.
 		Optionally exclude freshly-created DB messages (e.g., the current user input).
 		"""
+		return [
+			m
+			async for m in self.iter_openai_history(
+				conversation_id, exclude_message_ids=exclude_message_ids
+			)
+		]
 
-		messages = await self._fetch_messages(conversation_id)
-		if exclude_message_ids:
-			messages = [m for m in messages if m.id not in exclude_message_ids]
-
-		openai_msgs = self._messages_to_openai_history(messages)
-		return [m.to_openai_dict() for m in openai_msgs]
-
-	async def _fetch_messages(self, conversation_id: str) -> List[Message]:
-		"""Fetch all messages (and traces) for a conversation in chronological order."""
-
-		stmt = (
-			select(Message)
-			.options(selectinload(Message.traces))
-			.where(Message.conversation_id == conversation_id)
-			.order_by(Message.created_at)
+	async def iter_openai_history(
+		self,
+		conversation_id: str,
+		*,
+		exclude_message_ids: Optional[Set[str]] = None,
+	) -> AsyncIterator[dict]:
+		"""
+		Stream the OpenAI `messages` of a conversation, converting each DB
+		message (with its traces) as rows arrive instead of loading them all.
+		"""
+		result = await self.db.stream(
+			_FETCH_MESSAGES_STMT, {"conversation_id": conversation_id}
 		)
-		result = await self.db.execute(stmt)
-		return list(result.scalars().all())
-
-	def _messages_to_openai_history(
-		self, messages: Sequence[Message]
-	) -> List[OpenAIChatMessage]:
-		"""Convert persisted DB messages into a typed list of OpenAI chat messages."""
-		history: List[OpenAIChatMessage] = []
-		for msg in messages:
-			if msg.role == MessageRole.USER:
-				history.append(
-					OpenAIChatMessage(
-						role="user",
-						content=msg.content,
-					)
+		try:
+			async for msg in result.scalars():
+				if exclude_message_ids and msg.id in exclude_message_ids:
+					continue
+				for m in self._message_to_openai(msg):
+					yield m.to_openai_dict()
+		finally:
+			await result.close()
+
+	def _message_to_openai(self, msg: Message) -> List[OpenAIChatMessage]:
+		"""Convert one persisted DB message into OpenAI chat messages."""
+		if msg.role == MessageRole.USER:
+			return [
+				OpenAIChatMessage.model_construct(
+					role="user",
+					content=msg.content,
 				)
-				continue
+			]
 
-			if msg.role == MessageRole.ASSISTANT:
-				history.extend(self._assistant_message_to_openai(msg))
-				continue
+		if msg.role == MessageRole.ASSISTANT:
+			return self._assistant_message_to_openai(msg)
 
-		return history
+		return []
 
 	def _assistant_message_to_openai(
 		self, msg: Message
@@ -97,27 +113,37 @@ class MemoryService:
 		- trace type "thought"     -> optional assistant content attached to the tool_call step
 		- msg.content              -> final assistant answer
 		"""
-		traces = sorted(msg.traces or [], key=lambda t: t.timestamp)
+		# Single pass over the traces (already loaded in timestamp order):
+		# collect calls, results and first thought
+		tool_calls: List[OpenAIToolCall] = []
+		tool_results: List[OpenAIChatMessage] = []
+		thought_content: Optional[str] = None
+		for t in msg.traces or ():
+			if t.type == "tool_call":
+				tool_calls.append(self._trace_to_openai_tool_call(t))
+			elif t.type == "tool_result":
+				tool_results.append(self._trace_to_openai_tool_result(t))
+			elif t.type == "thought" and thought_content is None and t.content:
+				thought_content = t.content
 
-		tool_calls = self._build_openai_tool_calls(traces)
 		out: List[OpenAIChatMessage] = []
 
 		if tool_calls:
-			thought_content = self._first_trace_content(
-				traces, trace_type="thought"
-			)
-			assistant_step = OpenAIChatMessage(
+			assistant_step = OpenAIChatMessage.model_construct(
 				role="assistant",
 				content=thought_content,
 				tool_calls=tool_calls,
 			)
 			out.append(assistant_step)
-
-			out.extend(self._build_openai_tool_result_messages(traces))
+			out.extend(tool_results)
 
 		# Final assistant answer (if present)
 		if msg.content:
-			out.append(OpenAIChatMessage(role="assistant", content=msg.content))
+			out.append(
+				OpenAIChatMessage.model_construct(
+					role="assistant", content=msg.content
+				)
+			)
 
 		return out
 
@@ -125,62 +151,36 @@ class MemoryService:
 	# BUILD: OpenAI messages helpers
 	# ============================================================
 
-	def _build_openai_tool_calls(
-		self, traces: Sequence[TraceLog]
-	) -> Optional[List[OpenAIToolCall]]:
-		"""Build the assistant `tool_calls` array from stored `tool_call` traces."""
-
-		calls: List[OpenAIToolCall] = []
-		for t in traces:
-			if t.type != "tool_call":
-				continue
-			calls.append(
-				OpenAIToolCall(
-					id=t.tool_call_id,
-					type="function",
-					function=OpenAIToolFunction(
-						name=t.tool_name,
-						arguments=self._tool_args_to_arguments_json(
-							t.tool_args
-						),
-					),
-				)
-			)
-		return calls or None
-
-	def _build_openai_tool_result_messages(
-		self, traces: Sequence[TraceLog]
-	) -> List[OpenAIChatMessage]:
-		"""Build `tool` role messages from stored `tool_result` traces."""
-		out: List[OpenAIChatMessage] = []
-		for t in traces:
-			if t.type != "tool_result":
-				continue
-			out.append(
-				OpenAIChatMessage(
-					role="tool",
-					tool_call_id=t.tool_call_id,
-					name=t.tool_name,
-					content=t.content,
-				)
-			)
-		return out
+	def _trace_to_openai_tool_call(self, t: TraceLog) -> OpenAIToolCall:
+		"""Build one assistant `tool_calls` entry from a stored `tool_call` trace."""
+		return OpenAIToolCall.model_construct(
+			id=t.tool_call_id,
+			type="function",
+			function=OpenAIToolFunction.model_construct(
+				name=t.tool_name,
+				arguments=self._tool_args_to_arguments_json(t.tool_args),
+			),
+		)
 
-	def _first_trace_content(
-		self, traces: Sequence[TraceLog], *, trace_type: str
-	) -> Optional[str]:
-		"""Return the first non-empty trace content for a given trace type, if any."""
-		for t in traces:
-			if t.type == trace_type and t.content:
-				return t.content
-		return None
+	def _trace_to_openai_tool_result(self, t: TraceLog) -> OpenAIChatMessage:
+		"""Build a `tool` role message from a stored `tool_result` trace."""
+		return OpenAIChatMessage.model_construct(
+			role="tool",
+			tool_call_id=t.tool_call_id,
+			name=t.tool_name,
+			content=t.content,
+		)
 
 	def _tool_args_to_arguments_json(self, tool_args) -> str:
-		"""Normalize tool arguments into the JSON string format OpenAI expects."""
-		if tool_args is None:
-			return "{}"
+		"""
+		Normalize tool arguments into the JSON string format OpenAI expects.
+		Arguments are persisted pre-serialized, so this is normally a no-op.
+		"""
+		# Stored rows always hold a string, so that check comes first.
 		if isinstance(tool_args, str):
 			return tool_args
+		if tool_args is None:
+			return "{}"
 		if isinstance(tool_args, dict):
 			return json.dumps(tool_args)
 		# fallback: keep it representable
@@ -201,7 +201,6 @@ class MemoryService:
 		)
 		self.db.add(msg)
 		await self.db.commit()
-		await self.db.refresh(msg)
 		return msg
 
 	async def create_assistant_placeholder(
@@ -215,9 +214,86 @@ class MemoryService:
 		)
 		self.db.add(msg)
 		await self.db.commit()
-		await self.db.refresh(msg)
 		return msg
 
+	async def begin_turn(
+		self, *, conversation_id: str, user_content: str
+	) -> tuple[Message, Message]:
+		"""
+		Persist the user's message and the assistant placeholder in one commit.
+		Ids are generated client-side, so no refresh is needed afterwards.
+		"""
+		# Explicit timestamps keep the assistant row strictly after the user
+		# row, even if both defaults would land on the same clock tick.
+		now = datetime.now(timezone.utc)
+		user_msg = Message(
+			id=str(uuid.uuid4()),
+			conversation_id=conversation_id,
+			role=MessageRole.USER,
+			content=user_content,
+			created_at=now,
+		)
+		assistant_msg = Message(
+			id=str(uuid.uuid4()),
+			conversation_id=conversation_id,
+			role=MessageRole.ASSISTANT,
+			content="",
+			created_at=now + timedelta(microseconds=1),
+		)
+		self.db.add_all([user_msg, assistant_msg])
+		await self.db.commit()
+		return user_msg, assistant_msg
+
+	def _build_trace(
+		self,
+		*,
+		assistant_message_id: str,
+		event: AgentEvent,
+		timestamp: Optional[datetime] = None,
+	) -> TraceLog:
+		"""
+		Build (but do not persist) the `TraceLog` row for a non-answer agent event.
+		Citations of a CitationEvent are attached as child rows, so the trace and
+		its citations are inserted together on the next flush.
+		`timestamp` is when the event happened; it defaults to insert time.
+		"""
+		# Only pass it when given, so the column default still applies
+		extra = {"timestamp": timestamp} if timestamp is not None else {}
+		if isinstance(event, CitationEvent):
+			return TraceLog(
+				message_id=assistant_message_id,
+				type=event.type,
+				content=str(event.content),
+				citations=[
+					Citation(
+						source_type=c.source_type,
+						title=c.title,
+						url=c.url,
+						text=c.text,
+						page_span_start=c.page_span_start,
+						page_span_end=c.page_span_end,
+						gcs_path=c.gcs_path,
+						source_metadata=c.source_metadata,
+					)
+					for c in event.citations
+				],
+				**extra,
+			)
+
+		return TraceLog(
+			message_id=assistant_message_id,
+			type=event.type,
+			content=str(event.content),
+			tool_name=event.tool_name,
+			tool_args=(
+				json.dumps(event.tool_args)
+				if event.tool_args is not None
+				else None
+			),
+			tool_call_id=event.tool_call_id,
+			**extra,
+		)
+
 	async def append_citations_trace(
 		self,
 		*,
@@ -229,30 +305,11 @@ class MemoryService:
 		Creates a link via trace_id that allows tracing citations back to
 		the agent step / message that generated them.
 		"""
-		trace = TraceLog(
-			message_id=assistant_message_id,
-			type=event.type,
-			content=str(event.content),
-		)
-		self.db.add(trace)
-
-		# assigns trace.id without committing
-		await self.db.flush()
-
-		for c in event.citations:
-			self.db.add(
-				Citation(
-					trace_id=trace.id,
-					source_type=c.source_type,
-					title=c.title,
-					url=c.url,
-					text=c.text,
-					page_span_start=c.page_span_start,
-					page_span_end=c.page_span_end,
-					gcs_path=c.gcs_path,
-					source_metadata=c.source_metadata,
-				)
+		self.db.add(
+			self._build_trace(
+				assistant_message_id=assistant_message_id, event=event
 			)
+		)
 		# commit trace + citations together
 		await self.db.commit()
 
@@ -261,7 +318,7 @@ class MemoryService:
 	) -> None:
 		"""
 		Persist a non-answer agent event as a `TraceLog` linked to the assistant message.
-		Citations are saved to
+		Citations are saved as `Citation` rows linked to the trace.
 		"""
 
 		if isinstance(event, CitationEvent):
@@ -276,28 +333,80 @@ class MemoryService:
 				logger.error(f"Failed to append CitationEvent trace: {e}")
 				raise e
 
-		trace = TraceLog(
-			message_id=assistant_message_id,
-			type=event.type,
-			content=str(event.content),
-			tool_name=event.tool_name,
-			tool_args=event.tool_args,
-			tool_call_id=event.tool_call_id,
+		self.db.add(
+			self._build_trace(
+				assistant_message_id=assistant_message_id, event=event
+			)
+		)
+		await self.db.commit()
+
+	def _add_traces(
+		self,
+		*,
+		assistant_message_id: str,
+		events: Sequence[AgentEvent],
+		timestamps: Optional[Sequence[datetime]] = None,
+	) -> None:
+		"""
+		Stage trace rows for a batch of events in the current transaction.
+		`timestamps`, if given, holds when each event happened.
+		"""
+		if timestamps is None:
+			timestamps = [None] * len(events)
+		self.db.add_all(
+			[
+				self._build_trace(
+					assistant_message_id=assistant_message_id,
+					event=event,
+					timestamp=timestamp,
+				)
+				for event, timestamp in zip(events, timestamps, strict=True)
+			]
+		)
+
+	async def append_traces(
+		self,
+		*,
+		assistant_message_id: str,
+		events: Sequence[AgentEvent],
+		timestamps: Optional[Sequence[datetime]] = None,
+	) -> None:
+		"""
+		Persist a batch of non-answer agent events in a single commit.
+		Used at the end of a turn instead of one commit per streamed event.
+		"""
+		if not events:
+			return
+
+		self._add_traces(
+			assistant_message_id=assistant_message_id,
+			events=events,
+			timestamps=timestamps,
 		)
-		self.db.add(trace)
 		await self.db.commit()
 
 	async def finalize_assistant_message(
-		self, *, assistant_message_id: str, content: str
+		self,
+		*,
+		assistant_message_id: str,
+		content: str,
+		events: Sequence[AgentEvent] = (),
+		timestamps: Optional[Sequence[datetime]] = None,
 	) -> None:
-		"""Write the final assistant answer content into the placeholder message row."""
+		"""
+		Write the final assistant answer content into the placeholder message row.
+		Buffered trace events of the turn, if given, are committed in the same
+		transaction, stamped with `timestamps` (when each event was buffered).
+		"""
 
-		result = await self.db.execute(
-			select(Message).where(Message.id == assistant_message_id)
+		self._add_traces(
+			assistant_message_id=assistant_message_id,
+			events=events,
+			timestamps=timestamps,
+		)
+		await self.db.execute(
+			update(Message)
+			.where(Message.id == assistant_message_id)
+			.values(content=content)
 		)
-		msg = result.scalars().first()
-		if not msg:
-			return
-		msg.content = content
-		self.db.add(msg)
 		await self.db.commit()
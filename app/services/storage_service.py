@@ -1,8 +1,13 @@
 from google.cloud import storage
+from google.cloud.storage._signing import generate_signed_url_v4
 from google.oauth2 import service_account
-import datetime
+from urllib.parse import quote
 import asyncio
-from typing import Optional
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
 from functools import lru_cache
 
 from app.core.logging import get_logger
@@ -11,36 +16,74 @@ from app.schemas.chat import Citation, Message
 
 logger = get_logger(__name__)
 
+# Cached signed URLs are reused until this many seconds before they expire
+URL_CACHE_MARGIN_SECONDS = 60
+URL_CACHE_MAX_ENTRIES = 10_000
+# Upper bound on concurrent signing calls
+SIGNING_MAX_WORKERS = 20
+# Lifetime (seconds) of every signed URL we hand out. One value everywhere,
+# so URLs signed at citation time are cache hits for prewarm and refresh.
+SIGNED_URL_EXPIRATION = 3600
+
+
+@lru_cache(maxsize=4)
+def _load_credentials(info_json: str) -> service_account.Credentials:
+	"""Parse service account credentials (and their PEM key) once per key."""
+	return service_account.Credentials.from_service_account_info(
+		json.loads(info_json)
+	)
+
+
+@lru_cache(maxsize=4)
+def _storage_client(
+	project_id: Optional[str], info_json: str
+) -> storage.Client:
+	"""One storage client (HTTP session, token source) per project and key."""
+	return storage.Client(
+		credentials=_load_credentials(info_json), project=project_id
+	)
+
+
+def _credentials_json() -> str:
+	"""Canonical JSON of the configured credentials, used as a cache key."""
+	if not settings.GCP_CREDENTIALS_JSON:
+		raise EnvironmentError(
+			"GCP credentials not configured for StorageService."
+		)
+	return json.dumps(settings.GCP_CREDENTIALS_JSON, sort_keys=True)
+
 
 class StorageService:
 	def __init__(self, project_id: Optional[str] = None):
 		self.project_id = project_id
 		self._client = None
+		self._credentials = None
+		# (gcs_path, expiration) -> (signed url, monotonic reuse deadline)
+		self._url_cache: dict[tuple[str, int], tuple[str, float]] = {}
+		# Dedicated pool for blocking signing calls; it also caps concurrency
+		self._pool = ThreadPoolExecutor(
+			max_workers=SIGNING_MAX_WORKERS, thread_name_prefix="gcs-sign"
+		)
 
 	@property
-	def client(self) -> storage.Client:
+	def credentials(self) -> service_account.Credentials:
 		"""
-		Storage client requires servcie account identity, namely private key to sign URLs.
+		Service account credentials; their private key signs URLs locally.
 		Regular gcloud auth is not sufficient.
 		"""
+		if self._credentials is None:
+			self._credentials = _load_credentials(_credentials_json())
+		return self._credentials
 
-		if not settings.GCP_CREDENTIALS_JSON:
-			raise EnvironmentError(
-				"GCP credentials not configured for StorageService."
-			)
-
+	@property
+	def client(self) -> storage.Client:
+		"""Storage client built on the service account credentials."""
 		if self._client is None:
-			credentials = service_account.Credentials.from_service_account_info(
-				settings.GCP_CREDENTIALS_JSON
-			)
-			self._client = storage.Client(
-				credentials=credentials, project=self.project_id
-			)
-
+			self._client = _storage_client(self.project_id, _credentials_json())
 		return self._client
 
 	def generate_signed_url(
-		self, gcs_path: str, expiration: int = 3600
+		self, gcs_path: str, expiration: int = SIGNED_URL_EXPIRATION
 	) -> Optional[str]:
 		"""
 		Generates a signed URL for a GCS object.
@@ -55,55 +98,193 @@ class StorageService:
 		if not gcs_path.startswith("gs://"):
 			return None
 
-		path_parts = gcs_path[5:].split("/", 1)
-		if len(path_parts) != 2:
+		bucket_name, _, blob_name = gcs_path[5:].partition("/")
+		if not bucket_name or not blob_name:
 			return None
 
-		bucket_name, blob_name = path_parts
-
-		bucket = self.client.bucket(bucket_name)
-		blob = bucket.blob(blob_name)
-
-		url = blob.generate_signed_url(
-			version="v4",
-			expiration=datetime.timedelta(seconds=expiration),
+		# V4 signing is offline (RSA over a canonical request), so call the
+		# signer directly instead of building a Client/Bucket/Blob per URL.
+		return generate_signed_url_v4(
+			self.credentials,
+			resource=f"/{bucket_name}/{quote(blob_name, safe='/~')}",
+			# V4 takes a plain int as seconds from now; no timedelta needed
+			expiration=expiration,
 			method="GET",
 		)
-		return url
 
 	async def refresh_citations_signed_urls(
-		self, messages: list[Message], expiration: int = 3600
+		self, messages: list[Message], expiration: int = SIGNED_URL_EXPIRATION
 	) -> list[Message]:
 		"""
-		Refresh signed URLs for citations concurrently with a semaphore to limit concurrency.
+		Refresh signed URLs for citations concurrently on the signing pool.
 		"""
-		sem = asyncio.Semaphore(20)
+		citations = [
+			c
+			for msg in messages
+			for trace in (msg.traces or ())
+			for c in (trace.citations or ())
+			if c.gcs_path
+		]
+		# Common case: website-only citations, nothing to sign
+		if not citations:
+			return messages
 
-		async def _sign(gcs_path: str) -> Optional[str]:
-			async with sem:
-				return await asyncio.to_thread(
-					self.generate_signed_url, gcs_path, expiration
-				)
+		# Citations grouped by path, so each unique path is signed only once
+		buckets: dict[str, list[Citation]] = {}
+		now = time.monotonic()
+		for c in citations:
+			url = self._cached_url(c.gcs_path, expiration, now)
+			if url is not None:
+				c.url = url
+			else:
+				buckets.setdefault(c.gcs_path, []).append(c)
+
+		if not buckets:
+			return messages
+
+		paths = list(buckets)
+		results = await self._sign_paths(paths, expiration)
 
-		pending: list[asyncio.Task] = []
-		refs: list[Citation] = []
-
-		for msg in messages:
-			for trace in msg.traces or []:
-				for c in trace.citations or []:
-					if c.gcs_path:
-						refs.append(c)
-						pending.append(asyncio.create_task(_sign(c.gcs_path)))
-
-		if pending:
-			results = await asyncio.gather(*pending, return_exceptions=True)
-			for c, r in zip(refs, results):
-				if isinstance(r, Exception):
-					logger.exception("Failed generating signed URL", exc_info=r)
-					continue
+		for path, r in zip(paths, results):
+			# None: invalid path or failed signing; keep the current url
+			if r is None:
+				continue
+			for c in buckets[path]:
 				c.url = r
 
+		return messages
+
+	async def sign_urls(
+		self, gcs_paths: list[str], expiration: int = SIGNED_URL_EXPIRATION
+	) -> list[Optional[str]]:
+		"""
+		Signed URLs for the given paths, in order, without blocking the event
+		loop: fresh cached URLs are reused, the rest are signed on the pool.
+		Paths that are invalid or fail to sign map to None.
+		"""
+		now = time.monotonic()
+		urls = {p: self._cached_url(p, expiration, now) for p in gcs_paths}
+		missing = [p for p, url in urls.items() if url is None]
+		if missing:
+			urls.update(
+				zip(missing, await self._sign_paths(missing, expiration))
+			)
+		return [urls[p] for p in gcs_paths]
+
+	async def _sign_paths(
+		self, paths: list[str], expiration: int
+	) -> list[Optional[str]]:
+		"""
+		Sign unique paths on the pool and cache the results. Runs one executor
+		call per chunk of paths (at most one chunk per worker) instead of one
+		future per path.
+		"""
+		size = -(-len(paths) // SIGNING_MAX_WORKERS)
+		loop = asyncio.get_running_loop()
+		chunks = await asyncio.gather(
+			*(
+				loop.run_in_executor(
+					self._pool, self._sign_many, paths[i : i + size], expiration
+				)
+				for i in range(0, len(paths), size)
+			)
+		)
+		results = [r for chunk in chunks for r in chunk]
+		for path, r in zip(paths, results):
+			if r is not None:
+				self._cache_url(path, expiration, r)
+		return results
+
+	def prewarm_signed_urls(
+		self,
+		gcs_paths: Iterable[Optional[str]],
+		expiration: int = SIGNED_URL_EXPIRATION,
+	) -> None:
+		"""
+		Start signing paths on the pool without waiting for the result, so a
+		later `refresh_citations_signed_urls` for them is a cache lookup.
+		Must be called from the event loop.
+		"""
+		if not settings.GCP_CREDENTIALS_JSON:
+			return
+
+		now = time.monotonic()
+		paths = [
+			p
+			for p in dict.fromkeys(gcs_paths)
+			if p and self._cached_url(p, expiration, now) is None
+		]
+		if not paths:
+			return
+
+		def _store(future: asyncio.Future) -> None:
+			if future.cancelled() or future.exception() is not None:
+				return
+			for path, r in zip(paths, future.result()):
+				# Failures are left for the next refresh to retry
+				if r is not None:
+					self._cache_url(path, expiration, r)
+
+		asyncio.get_running_loop().run_in_executor(
+			self._pool, self._sign_many, paths, expiration
+		).add_done_callback(_store)
+
+	def _sign_many(
+		self, paths: list[str], expiration: int
+	) -> list[Optional[str]]:
+		"""Sign a batch of paths; a failure is logged and yields None."""
+		results: list[Optional[str]] = []
+		for path in paths:
+			try:
+				results.append(self.generate_signed_url(path, expiration))
+			except Exception:
+				logger.exception(f"Failed generating signed URL for {path}")
+				results.append(None)
+		return results
+
+	def close(self) -> None:
+		"""Release the signing pool without waiting for queued work."""
+		self._pool.shutdown(wait=False, cancel_futures=True)
+
+	def _cached_url(
+		self, gcs_path: str, expiration: int, now: float
+	) -> Optional[str]:
+		"""Cached signed URL for the path, if it is still fresh."""
+		cached = self._url_cache.get((gcs_path, expiration))
+		if cached is not None and now < cached[1]:
+			return cached[0]
+		return None
+
+	def _cache_url(self, gcs_path: str, expiration: int, url: str) -> None:
+		"""Remember a fresh signed URL until shortly before it expires."""
+		if len(self._url_cache) >= URL_CACHE_MAX_ENTRIES:
+			# Drop the oldest entry (dicts keep insertion order)
+			del self._url_cache[next(iter(self._url_cache))]
+		self._url_cache[(gcs_path, expiration)] = (
+			url,
+			time.monotonic() + expiration - URL_CACHE_MARGIN_SECONDS,
+		)
+
+
+_storage_service: Optional[StorageService] = None
+_storage_service_lock = threading.Lock()
+
 
-@lru_cache()
 def get_storage_service() -> StorageService:
-	return StorageService()
+	"""Process-wide StorageService (shared URL cache and signing pool)."""
+	global _storage_service
+	if _storage_service is None:
+		# Locked so concurrent first calls (from any thread) create one instance
+		with _storage_service_lock:
+			if _storage_service is None:
+				_storage_service = StorageService()
+	return _storage_service
+
+
+def close_storage_service() -> None:
+	"""Close the shared storage service on shutdown, if it was ever created."""
+	global _storage_service
+	with _storage_service_lock:
+		if _storage_service is not None:
+			_storage_service.close()
+			_storage_service = None
@@ -24,6 +24,13 @@ def test_agent_event_full():
 	assert event.tool_args == {"arg": 1}
 
 
+def test_agent_event_emit_matches_constructor():
+	emitted = AgentEvent.emit(type="error", content="boom", tool_name="tool")
+	built = AgentEvent(type="error", content="boom", tool_name="tool")
+	assert emitted == built
+	assert emitted.model_dump_json() == built.model_dump_json()
+
+
 def test_callback_context_defaults():
 	ctx = CallbackContext()
 	assert ctx.modified_input is None
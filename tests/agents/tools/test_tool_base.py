@@ -1,9 +1,16 @@
+import asyncio
 import pytest
-import json
 from pydantic import BaseModel
 from app.agents.tools.base import BaseTool
 from app.agents.models import CallbackContext, AgentEvent
-from unittest.mock import MagicMock
+
+
+# Tool call arguments as the LLM sends them (pre-serialized JSON)
+_ARGS_HELLO = '{"query": "hello"}'
+_ARGS_ERROR = '{"query": "error"}'
+_ARGS_ORIGINAL = '{"query": "original"}'
+_ARGS_TEST = '{"query": "test"}'
+_ARGS_KEY_VALUE = '{"key": "value"}'
 
 
 class InputModel(BaseModel):
@@ -48,6 +55,60 @@ async def test_to_openai_tool():
 	assert oai_tool["function"]["name"] == "mock_tool"
 
 
+def test_openai_tool_is_cached_per_class():
+	class ChildTool(MockTool):
+		name = "child_tool"
+
+	first = MockTool().to_openai_tool()
+	assert MockTool().to_openai_tool() is first
+	assert MockTool().schema is first["function"]["parameters"]
+
+	child = ChildTool().to_openai_tool()
+	assert child is not first
+	assert child["function"]["name"] == "child_tool"
+
+
+class OtherInput(BaseModel):
+	topic: str
+
+
+def test_instance_overrides_bypass_class_cache():
+	"""Name, description or input_schema set on an instance are respected."""
+	cached = MockTool().to_openai_tool()
+
+	tool = MockTool()
+	tool.name = "renamed_tool"
+	tool.description = "Renamed"
+	tool.input_schema = OtherInput
+
+	oai_tool = tool.to_openai_tool()
+	assert oai_tool["function"]["name"] == "renamed_tool"
+	assert oai_tool["function"]["description"] == "Renamed"
+	assert "topic" in oai_tool["function"]["parameters"]["properties"]
+	assert "topic" in tool.schema["properties"]
+
+	# The class-level cache is left untouched
+	assert MockTool().to_openai_tool() is cached
+	assert cached["function"]["name"] == "mock_tool"
+
+
+@pytest.mark.asyncio
+async def test_instance_input_schema_is_used_for_validation():
+	tool = MockTool()
+	tool.input_schema = OtherInput
+	ctx = CallbackContext()
+
+	events = [
+		event
+		async for event in tool.run_tool_and_parse_output(
+			effective_args={"query": "hello"}, context=ctx
+		)
+	]
+
+	assert [e.type for e in events] == ["error"]
+	assert "topic" in ctx.tool_result
+
+
 def test_parse_tool_args():
 	assert BaseTool.parse_tool_args('{"a": 1}') == {"a": 1}
 	assert BaseTool.parse_tool_args({"a": 1}) == {"a": 1}
@@ -56,15 +117,12 @@ def test_parse_tool_args():
 
 
 @pytest.mark.asyncio
-async def test_execute_success():
+async def test_execute_success(make_tool_call):
 	tool = MockTool()
 	ctx = CallbackContext()
 
 	# Create a mock tool call object (simulating OpenAI object)
-	tool_call = MagicMock()
-	tool_call.id = "call_123"
-	tool_call.function.name = "mock_tool"
-	tool_call.function.arguments = json.dumps({"query": "hello"})
+	tool_call = make_tool_call("call_123", "mock_tool", _ARGS_HELLO)
 
 	events = []
 	async for event in tool.execute(tool_call, ctx):
@@ -76,14 +134,11 @@ async def test_execute_success():
 
 
 @pytest.mark.asyncio
-async def test_execute_error():
+async def test_execute_error(make_tool_call):
 	tool = MockTool()
 	ctx = CallbackContext()
 
-	tool_call = MagicMock()
-	tool_call.id = "call_err"
-	tool_call.function.name = "mock_tool"
-	tool_call.function.arguments = json.dumps({"query": "error"})
+	tool_call = make_tool_call("call_err", "mock_tool", _ARGS_ERROR)
 
 	events = []
 	async for event in tool.execute(tool_call, ctx):
@@ -96,14 +151,11 @@ async def test_execute_error():
 
 
 @pytest.mark.asyncio
-async def test_execute_streaming_tool_yields_events():
+async def test_execute_streaming_tool_yields_events(make_tool_call):
 	tool = StreamingTool()
 	ctx = CallbackContext()
 
-	tool_call = MagicMock()
-	tool_call.id = "call_stream"
-	tool_call.function.name = "streaming_tool"
-	tool_call.function.arguments = json.dumps({"query": "hello"})
+	tool_call = make_tool_call("call_stream", "streaming_tool", _ARGS_HELLO)
 
 	events = []
 	async for event in tool.execute(tool_call, ctx):
@@ -151,7 +203,7 @@ class NoSchemaTool(BaseTool):
 
 
 @pytest.mark.asyncio
-async def test_tool_with_before_callback_modifies_input():
+async def test_tool_with_before_callback_modifies_input(make_tool_call):
 	"""Before callback can modify tool arguments before execution."""
 
 	async def before_cb(tool_args: dict, context: CallbackContext):
@@ -163,10 +215,7 @@ async def test_tool_with_before_callback_modifies_input():
 	tool = ToolWithCallbacks(before_tool_callback=before_cb)
 	ctx = CallbackContext()
 
-	tool_call = MagicMock()
-	tool_call.id = "call_before"
-	tool_call.function.name = "callback_tool"
-	tool_call.function.arguments = json.dumps({"query": "original"})
+	tool_call = make_tool_call("call_before", "callback_tool", _ARGS_ORIGINAL)
 
 	events = []
 	async for event in tool.execute(tool_call, ctx):
@@ -178,7 +227,7 @@ async def test_tool_with_before_callback_modifies_input():
 
 
 @pytest.mark.asyncio
-async def test_tool_with_after_callback_modifies_result():
+async def test_tool_with_after_callback_modifies_result(make_tool_call):
 	"""After callback can modify tool result after execution."""
 
 	async def after_cb(tool_result: str, context: CallbackContext):
@@ -189,10 +238,7 @@ async def test_tool_with_after_callback_modifies_result():
 	tool = ToolWithCallbacks(after_tool_callback=after_cb)
 	ctx = CallbackContext()
 
-	tool_call = MagicMock()
-	tool_call.id = "call_after"
-	tool_call.function.name = "callback_tool"
-	tool_call.function.arguments = json.dumps({"query": "test"})
+	tool_call = make_tool_call("call_after", "callback_tool", _ARGS_TEST)
 
 	events = []
 	async for event in tool.execute(tool_call, ctx):
@@ -209,7 +255,7 @@ async def test_tool_with_after_callback_modifies_result():
 
 
 @pytest.mark.asyncio
-async def test_tool_without_input_schema():
+async def test_tool_without_input_schema(make_tool_call):
 	"""Tool with input_schema = None should return empty schema."""
 	tool = NoSchemaTool()
 
@@ -224,10 +270,9 @@ async def test_tool_without_input_schema():
 
 	# Execution should still work
 	ctx = CallbackContext()
-	tool_call = MagicMock()
-	tool_call.id = "call_no_schema"
-	tool_call.function.name = "no_schema_tool"
-	tool_call.function.arguments = json.dumps({"key": "value"})
+	tool_call = make_tool_call(
+		"call_no_schema", "no_schema_tool", _ARGS_KEY_VALUE
+	)
 
 	events = []
 	async for event in tool.execute(tool_call, ctx):
@@ -304,3 +349,71 @@ async def test_tool_run_invalid_list_args():
 	error_events = [e for e in events if e.type == "error"]
 	assert len(error_events) == 1
 	assert "list" in error_events[0].content.lower()
+
+
+@pytest.mark.asyncio
+async def test_tool_run_args_failing_input_schema():
+	"""Args are validated against input_schema before run() is called."""
+	tool = MockTool()
+	ctx = CallbackContext()
+
+	events = []
+	async for event in tool.run_tool_and_parse_output(
+		effective_args={"q": "hello"},
+		context=ctx,
+	):
+		events.append(event)
+
+	error_events = [e for e in events if e.type == "error"]
+	assert len(error_events) == 1
+	assert ctx.tool_result.startswith("ValidationError")
+	assert "query" in ctx.tool_result
+
+
+class GatedTool(BaseTool):
+	"""The "first" call only finishes once the "second" call has run."""
+
+	name = "gated_tool"
+	description = "Waits for its sibling call before answering"
+	input_schema = InputModel
+
+	def __init__(self):
+		super().__init__()
+		self.second_ran = asyncio.Event()
+
+	async def run(self, query: str):
+		if query == "first":
+			await self.second_ran.wait()
+		else:
+			self.second_ran.set()
+		return f"Result: {query}"
+
+
+@pytest.mark.asyncio
+async def test_execute_many_runs_concurrently_in_call_order(make_tool_call):
+	"""Batched calls overlap, but events come out grouped in input order."""
+	tool = GatedTool()
+	calls = []
+	for query in ("first", "second"):
+		tool_call = make_tool_call(
+			f"call_{query}", "gated_tool", f'{{"query": "{query}"}}'
+		)
+		calls.append((tool, tool_call, CallbackContext()))
+
+	async def collect():
+		return [event async for event in BaseTool.execute_many(calls)]
+
+	# Run one after the other, the first call would wait forever; the
+	# timeout only turns that deadlock into a failure.
+	events = await asyncio.wait_for(collect(), timeout=5)
+
+	assert [(e.type, e.tool_call_id) for e in events] == [
+		("tool_call", "call_first"),
+		("tool_result", "call_first"),
+		("tool_call", "call_second"),
+		("tool_result", "call_second"),
+	]
+	assert [ctx.tool_result for _, _, ctx in calls] == [
+		"Result: first",
+		"Result: second",
+	]
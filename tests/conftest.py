@@ -1,51 +1,286 @@
+import asyncio
+import contextlib
+import os
+from dataclasses import dataclass
 import pytest
+import pytest_asyncio
 from typing import AsyncIterator
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event, make_url
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import (
+	AsyncEngine,
+	AsyncSession,
+	create_async_engine,
+)
 from httpx import AsyncClient, ASGITransport
 
+# Read at import time by app.agents.examples.example_tools
+os.environ.setdefault("DUMMY_SLEEP_SECONDS", "0")
+
 from app.core.database import Base, get_db
+from app.models.chat import Conversation
+from app.services.chat_service import ChatService
 from app.main import app
 
+# Each pytest-xdist worker gets its own shared-cache in-memory database.
+_WORKER = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+# Optional real database (e.g. Postgres) to run the suite against instead.
+_TEST_DB_URL = os.environ.get("TEST_DB_URL")
+# Per-worker Postgres schema, so workers sharing TEST_DB_URL stay isolated.
+_PG_SCHEMA = f"test_{_WORKER}"
+_SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO")
+
+try:
+	import uvloop
+except ImportError:  # not available on Windows
+	uvloop = None
+
+
+def pytest_asyncio_loop_factories(config, item):
+	"""
+	Run async tests and fixtures on uvloop where it is installed.
+	"""
+	if uvloop is None:
+		return {"asyncio": asyncio.new_event_loop}
+	return {"uvloop": uvloop.new_event_loop}
+
+
+@dataclass(frozen=True, slots=True)
+class FakeFunction:
+	name: str
+	arguments: str
+
+
+@dataclass(frozen=True, slots=True)
+class FakeToolCall:
+	"""Stand-in for an OpenAI ChatCompletionMessageToolCall."""
+
+	id: str
+	function: FakeFunction
+
+
+class StubAgent:
+	"""Just enough of an agent for ChatService: a name and process_turn."""
+
+	def __init__(self, name: str, process_turn):
+		self.name = name
+		self._process_turn = process_turn
+
+	def process_turn(self, *args, **kwargs):
+		return self._process_turn(*args, **kwargs)
+
 
 @pytest.fixture
-async def db_session() -> AsyncIterator[AsyncSession]:
+def make_stub_agent():
+	"""Factory for stub agents wrapping an async-generator function."""
+	return StubAgent
+
+
+@pytest.fixture
+def make_tool_call():
+	"""Factory for lightweight tool call objects."""
+
+	def _make(id: str, name: str, arguments: str) -> FakeToolCall:
+		return FakeToolCall(id=id, function=FakeFunction(name, arguments))
+
+	return _make
+
+
+def _sqlite_memory_engine() -> AsyncEngine:
+	"""
+	In-memory SQLite engine. StaticPool pins it to a single connection, so
+	the database and its aiosqlite worker thread are created once.
+	"""
+	engine = create_async_engine(
+		f"sqlite+aiosqlite:///file:test_{_WORKER}?mode=memory&cache=shared&uri=true",
+		echo=False,
+		future=True,
+		poolclass=StaticPool,
+		connect_args={"check_same_thread": False},
+	)
+
+	# pysqlite/aiosqlite emit BEGIN lazily and break SAVEPOINT handling; let
+	# SQLAlchemy own transaction boundaries instead.
+	@event.listens_for(engine.sync_engine, "connect")
+	def _configure_connection(dbapi_connection, connection_record):
+		dbapi_connection.isolation_level = None
+		# Throwaway database: no durability, no locking round-trips
+		cursor = dbapi_connection.cursor()
+		cursor.execute("PRAGMA journal_mode=MEMORY")
+		cursor.execute("PRAGMA synchronous=OFF")
+		cursor.execute("PRAGMA temp_store=MEMORY")
+		cursor.execute("PRAGMA locking_mode=EXCLUSIVE")
+		cursor.close()
+
+	@event.listens_for(engine.sync_engine, "begin")
+	def _emit_begin(conn):
+		conn.exec_driver_sql("BEGIN")
+
+	return engine
+
+
+def _external_engine(url: str) -> AsyncEngine:
+	"""
+	Engine for TEST_DB_URL. Postgres always goes through asyncpg, with one
+	connection per xdist worker, and each worker works in its own schema
+	so their create_all/drop_all calls don't race.
+	"""
+	db_url = make_url(url)
+	if db_url.get_backend_name() != "postgresql":
+		return create_async_engine(db_url, echo=False, future=True)
+	return create_async_engine(
+		db_url.set(drivername="postgresql+asyncpg"),
+		echo=False,
+		future=True,
+		pool_pre_ping=True,
+		pool_size=1,
+		max_overflow=0,
+		connect_args={"server_settings": {"search_path": _PG_SCHEMA}},
+	)
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def _engine() -> AsyncIterator[AsyncEngine]:
 	"""
-	Create an isolated in-memory SQLite DB per test, including all tables.
+	One engine (and schema) shared by the whole test session: in-memory
+	SQLite by default, or the database at TEST_DB_URL.
 	"""
-	engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+	if _TEST_DB_URL:
+		engine = _external_engine(_TEST_DB_URL)
+	else:
+		engine = _sqlite_memory_engine()
+
+	is_pg = engine.dialect.name == "postgresql"
 	async with engine.begin() as conn:
+		if is_pg:
+			await conn.exec_driver_sql(
+				f"DROP SCHEMA IF EXISTS {_PG_SCHEMA} CASCADE"
+			)
+			await conn.exec_driver_sql(f"CREATE SCHEMA {_PG_SCHEMA}")
 		await conn.run_sync(Base.metadata.create_all)
 
-	SessionLocal = sessionmaker(
-		autocommit=False,
-		autoflush=False,
-		bind=engine,
-		class_=AsyncSession,
-		expire_on_commit=False,
-	)
-	async with SessionLocal() as session:
-		yield session
+	yield engine
 
+	if _TEST_DB_URL:
+		async with engine.begin() as conn:
+			if is_pg:
+				await conn.exec_driver_sql(f"DROP SCHEMA {_PG_SCHEMA} CASCADE")
+			else:
+				await conn.run_sync(Base.metadata.drop_all)
 	await engine.dispose()
 
 
 @pytest.fixture
-async def test_client(db_session: AsyncSession) -> AsyncIterator[AsyncClient]:
+async def db_session(_engine: AsyncEngine) -> AsyncIterator[AsyncSession]:
 	"""
-	Create a test client with an isolated in-memory database.
-	Overrides the get_db dependency to use the test session.
+	Isolated session per test: everything runs inside an outer transaction
+	that is rolled back afterwards, and session commits only release
+	SAVEPOINTs, so no test sees another test's rows.
 	"""
+	async with _engine.connect() as conn:
+		outer = await conn.begin()
+		session = AsyncSession(
+			bind=conn,
+			autoflush=False,
+			expire_on_commit=False,
+			join_transaction_mode="create_savepoint",
+		)
+		try:
+			yield session
+		finally:
+			await session.close()
+			await outer.rollback()
 
-	async def override_get_db():
-		yield db_session
 
-	app.dependency_overrides[get_db] = override_get_db
+@pytest.fixture
+def count_queries(_engine: AsyncEngine):
+	"""
+	Context manager collecting the SQL statements sent to the test database
+	while it is active, for asserting on query counts. The SAVEPOINTs that
+	db_session's isolation adds are left out.
+	"""
+
+	@contextlib.contextmanager
+	def _count():
+		statements: list[str] = []
+
+		def _record(conn, cursor, statement, parameters, context, executemany):
+			if not statement.startswith(_SAVEPOINT_STATEMENTS):
+				statements.append(statement)
+
+		event.listen(_engine.sync_engine, "before_cursor_execute", _record)
+		try:
+			yield statements
+		finally:
+			event.remove(_engine.sync_engine, "before_cursor_execute", _record)
+
+	return _count
+
+
+@pytest.fixture
+def chat_service(db_session: AsyncSession) -> ChatService:
+	"""ChatService on the test session, for tests that don't need HTTP."""
+	return ChatService(db_session)
+
+
+@pytest.fixture
+def conversations_factory(db_session: AsyncSession):
+	"""
+	Insert conversations straight into the test database, one flush for all.
+	"""
+
+	async def _create(titles: list[str]) -> list[Conversation]:
+		conversations = [Conversation(title=title) for title in titles]
+		db_session.add_all(conversations)
+		await db_session.flush()
+		return conversations
+
+	return _create
+
 
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def _client() -> AsyncIterator[AsyncClient]:
+	"""
+	One HTTP client for the whole session. ASGITransport never runs the app
+	lifespan, so this is just the transport and connection bookkeeping.
+	"""
 	transport = ASGITransport(app=app)
 	async with AsyncClient(
 		transport=transport, base_url="http://test"
 	) as client:
 		yield client
 
-	app.dependency_overrides.clear()
+
+@pytest.fixture
+async def test_client(
+	_client: AsyncClient, db_session: AsyncSession
+) -> AsyncIterator[AsyncClient]:
+	"""
+	Shared test client bound to this test's isolated database session.
+	Overrides the get_db dependency to use the test session.
+	"""
+
+	async def override_get_db():
+		yield db_session
+
+	app.dependency_overrides[get_db] = override_get_db
+	yield _client
+	app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture
+def override_dependency():
+	"""
+	Install FastAPI dependency overrides for one test. Only the overrides
+	installed through this fixture are removed afterwards.
+	"""
+	installed = []
+
+	def _override(dependency, provider) -> None:
+		app.dependency_overrides[dependency] = provider
+		installed.append(dependency)
+
+	yield _override
+
+	for dependency in installed:
+		app.dependency_overrides.pop(dependency, None)
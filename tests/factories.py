@@ -0,0 +1,92 @@
+import json
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.chat import (
+	Citation,
+	Conversation,
+	Message,
+	MessageRole,
+	TraceLog,
+)
+from app.services.storage_service import StorageService
+
+
+async def build_tool_turn(session: AsyncSession) -> Conversation:
+	"""
+	Persist one finished tool-using turn in a single commit: the user asks
+	"Search for cats", the assistant thinks, calls `search`, gets a result
+	and answers "Cats are great.".
+	"""
+	conv = Conversation(
+		title="Tool Turn",
+		messages=[
+			Message(role=MessageRole.USER, content="Search for cats"),
+			Message(
+				role=MessageRole.ASSISTANT,
+				content="Cats are great.",
+				traces=[
+					TraceLog(type="thought", content="Let me search that."),
+					TraceLog(
+						type="tool_call",
+						tool_name="search",
+						tool_call_id="call_1",
+						tool_args=json.dumps({"q": "cats"}),
+					),
+					TraceLog(
+						type="tool_result",
+						tool_name="search",
+						tool_call_id="call_1",
+						content="Result: cats...",
+					),
+				],
+			),
+		],
+	)
+	session.add(conv)
+	await session.commit()
+	return conv
+
+
+def pdf_citation(
+	gcs_path: str, *, title: str = "D", url: str | None = None
+) -> Citation:
+	"""Unsaved PDF citation pointing at `gcs_path`."""
+	return Citation(
+		trace_id="t1",
+		source_type="pdf",
+		title=title,
+		url=url,
+		gcs_path=gcs_path,
+	)
+
+
+def message_with_citations(*citations: Citation) -> Message:
+	"""Unsaved assistant message carrying `citations` on a single trace."""
+	trace = TraceLog(
+		message_id="m1",
+		type="citations",
+		content="c",
+		citations=list(citations),
+	)
+	return Message(
+		conversation_id="conv1",
+		role=MessageRole.ASSISTANT,
+		content="a",
+		traces=[trace],
+	)
+
+
+def stub_signer(service: StorageService) -> list[str]:
+	"""
+	Swap the service's signer for one returning "signed://<path>", so no GCP
+	credentials are needed. Returns the list the signed paths are recorded in.
+	"""
+	sign_calls: list[str] = []
+
+	def _sign(gcs_path: str, expiration: int = 3600) -> str:
+		sign_calls.append(gcs_path)
+		return f"signed://{gcs_path}"
+
+	service.generate_signed_url = _sign  # type: ignore[method-assign]
+	return sign_calls
@@ -7,15 +7,54 @@ from API endpoints through services to database persistence.
 
 import json
 import pytest
-from unittest.mock import patch, MagicMock
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.orm import selectinload
 
 from app.models.chat import Conversation, Message, MessageRole, TraceLog
+from app.services.chat_service import ChatService, get_agents
 from app.services.memory_service import MemoryService
+from app.schemas.chat import ChatRequest
 from app.agents.models import AgentEvent, CitationEvent, CitationItem
+from app.agents.examples.dummy_agent import DummyAgent
+from app.agents.examples.example_tools import DummySearchTool
+from tests.factories import build_tool_turn
+
+
+async def _run_turn(
+	service: ChatService, conversation_id: str, content: str
+) -> list[dict]:
+	"""Run one chat turn through the service and return the streamed events."""
+	request = ChatRequest(content=content, agent_id="default")
+	return [
+		json.loads(line)
+		async for line in service.process_message(conversation_id, request)
+	]
+
+
+async def _assistant_traces(
+	db: AsyncSession, conversation_id: str
+) -> list[TraceLog]:
+	"""Traces of the assistant messages in a conversation, in one SELECT."""
+	result = await db.execute(
+		select(TraceLog)
+		.join(TraceLog.message)
+		.where(Message.conversation_id == conversation_id)
+		.where(Message.role == MessageRole.ASSISTANT)
+		.order_by(TraceLog.timestamp)
+	)
+	return list(result.scalars())
+
+
+async def _message_count(db: AsyncSession, conversation_id: str) -> int:
+	"""Number of messages stored for a conversation."""
+	result = await db.execute(
+		select(func.count())
+		.select_from(Message)
+		.where(Message.conversation_id == conversation_id)
+	)
+	return result.scalar_one()
 
 
 class TestConversationFlow:
@@ -23,39 +62,28 @@ class TestConversationFlow:
 
 	@pytest.mark.asyncio
 	async def test_create_conversation_send_message_verify_persistence(
-		self, test_client: AsyncClient, db_session: AsyncSession
+		self,
+		chat_service: ChatService,
+		db_session: AsyncSession,
+		make_stub_agent,
 	):
 		"""
 		Full flow: Create conversation -> Send message -> Verify DB state.
 		"""
-		# 1. Create conversation via API
-		create_response = await test_client.post(
-			"/api/conversations",
-			json={"title": "Integration Test"},
-		)
-		assert create_response.status_code == 200
-		conv_id = create_response.json()["id"]
+		# 1. Create conversation
+		conv = await chat_service.create_conversation(title="Integration Test")
+		conv_id = conv.id
 
 		# 2. Send message with mocked agent
-		mock_agent = MagicMock()
-
 		async def mock_process_turn(*args, **kwargs):
 			yield AgentEvent(type="thought", content="Analyzing...")
 			yield AgentEvent(type="answer", content="Here is my response.")
 
-		mock_agent.process_turn = mock_process_turn
-		mock_agent.name = "TestAgent"
+		mock_agent = make_stub_agent("TestAgent", mock_process_turn)
+		chat_service.agents = {"default": mock_agent}
 
-		with patch.dict(
-			"app.services.chat_service.AGENTS",
-			{"default": mock_agent},
-		):
-			message_response = await test_client.post(
-				f"/api/chat/{conv_id}/message",
-				json={"content": "Hello, world!", "agent_id": "default"},
-			)
-
-		assert message_response.status_code == 200
+		events = await _run_turn(chat_service, conv_id, "Hello, world!")
+		assert [e["type"] for e in events] == ["thought", "answer"]
 
 		# 3. Verify DB state - conversation exists with messages
 		result = await db_session.execute(
@@ -70,14 +98,14 @@ class TestConversationFlow:
 		assert conv is not None
 		assert len(conv.messages) == 2  # User + Assistant
 
+		by_role = {m.role: m for m in conv.messages}
+
 		# Verify user message
-		user_msg = next(m for m in conv.messages if m.role == MessageRole.USER)
+		user_msg = by_role[MessageRole.USER]
 		assert user_msg.content == "Hello, world!"
 
 		# Verify assistant message
-		assistant_msg = next(
-			m for m in conv.messages if m.role == MessageRole.ASSISTANT
-		)
+		assistant_msg = by_role[MessageRole.ASSISTANT]
 		assert assistant_msg.content == "Here is my response."
 
 		# Verify traces (thought should be saved)
@@ -87,19 +115,18 @@ class TestConversationFlow:
 
 	@pytest.mark.asyncio
 	async def test_multi_turn_conversation(
-		self, test_client: AsyncClient, db_session: AsyncSession
+		self,
+		chat_service: ChatService,
+		db_session: AsyncSession,
+		make_stub_agent,
 	):
 		"""
 		Test multi-turn conversation maintains history correctly.
 		"""
 		# Create conversation
-		create_response = await test_client.post(
-			"/api/conversations",
-			json={"title": "Multi-turn Test"},
-		)
-		conv_id = create_response.json()["id"]
+		conv = await chat_service.create_conversation(title="Multi-turn Test")
+		conv_id = conv.id
 
-		mock_agent = MagicMock()
 		turn_count = [0]
 
 		async def mock_process_turn(history, user_input, *args, **kwargs):
@@ -111,43 +138,19 @@ class TestConversationFlow:
 				type="answer", content=f"Response to turn {turn_count[0]}"
 			)
 
-		mock_agent.process_turn = mock_process_turn
-		mock_agent.name = "HistoryAgent"
-
-		with patch.dict(
-			"app.services.chat_service.AGENTS",
-			{"default": mock_agent},
-		):
-			# Turn 1
-			await test_client.post(
-				f"/api/chat/{conv_id}/message",
-				json={"content": "First message", "agent_id": "default"},
-			)
-
-			# Turn 2
-			await test_client.post(
-				f"/api/chat/{conv_id}/message",
-				json={"content": "Second message", "agent_id": "default"},
-			)
+		mock_agent = make_stub_agent("HistoryAgent", mock_process_turn)
+		chat_service.agents = {"default": mock_agent}
 
-			# Turn 3
-			await test_client.post(
-				f"/api/chat/{conv_id}/message",
-				json={"content": "Third message", "agent_id": "default"},
-			)
+		# Turns depend on the previous history, so they run in sequence
+		await _run_turn(chat_service, conv_id, "First message")
+		await _run_turn(chat_service, conv_id, "Second message")
+		await _run_turn(chat_service, conv_id, "Third message")
 
 		assert turn_count[0] == 3
 
-		# Verify all messages persisted
-		result = await db_session.execute(
-			select(Conversation)
-			.options(selectinload(Conversation.messages))
-			.where(Conversation.id == conv_id)
-		)
-		conv = result.scalars().first()
-
+		# Verify all messages persisted:
 		# 3 user messages + 3 assistant messages = 6 total
-		assert len(conv.messages) == 6
+		assert await _message_count(db_session, conv_id) == 6
 
 
 class TestToolCallFlow:
@@ -155,18 +158,16 @@ class TestToolCallFlow:
 
 	@pytest.mark.asyncio
 	async def test_tool_call_and_result_persisted(
-		self, test_client: AsyncClient, db_session: AsyncSession
+		self,
+		chat_service: ChatService,
+		db_session: AsyncSession,
+		make_stub_agent,
 	):
 		"""
 		Verify tool calls and results are saved as traces.
 		"""
-		create_response = await test_client.post(
-			"/api/conversations",
-			json={"title": "Tool Flow Test"},
-		)
-		conv_id = create_response.json()["id"]
-
-		mock_agent = MagicMock()
+		conv = await chat_service.create_conversation(title="Tool Flow Test")
+		conv_id = conv.id
 
 		async def mock_process_turn(*args, **kwargs):
 			yield AgentEvent(type="thought", content="I need to search...")
@@ -187,41 +188,24 @@ class TestToolCallFlow:
 				type="answer", content="Based on search: Python is great!"
 			)
 
-		mock_agent.process_turn = mock_process_turn
-		mock_agent.name = "ToolAgent"
+		mock_agent = make_stub_agent("ToolAgent", mock_process_turn)
+		chat_service.agents = {"default": mock_agent}
 
-		with patch.dict(
-			"app.services.chat_service.AGENTS",
-			{"default": mock_agent},
-		):
-			response = await test_client.post(
-				f"/api/chat/{conv_id}/message",
-				json={"content": "Tell me about Python", "agent_id": "default"},
-			)
-
-		assert response.status_code == 200
+		await _run_turn(chat_service, conv_id, "Tell me about Python")
 
-		# Verify traces in DB
-		result = await db_session.execute(
-			select(Message)
-			.options(selectinload(Message.traces))
-			.where(Message.conversation_id == conv_id)
-			.where(Message.role == MessageRole.ASSISTANT)
-		)
-		assistant_msg = result.scalars().first()
+		# Verify traces in DB (one query straight to the trace rows)
+		traces = await _assistant_traces(db_session, conv_id)
 
-		trace_types = [t.type for t in assistant_msg.traces]
+		trace_types = [t.type for t in traces]
 		assert "thought" in trace_types
 		assert "tool_call" in trace_types
 		assert "tool_result" in trace_types
 
 		# Verify tool_call trace has correct metadata
-		tool_call_trace = next(
-			t for t in assistant_msg.traces if t.type == "tool_call"
-		)
+		tool_call_trace = next(t for t in traces if t.type == "tool_call")
 		assert tool_call_trace.tool_name == "search"
 		assert tool_call_trace.tool_call_id == "call_abc123"
-		assert tool_call_trace.tool_args == {"query": "python"}
+		assert json.loads(tool_call_trace.tool_args) == {"query": "python"}
 
 
 class TestHistoryReconstruction:
@@ -235,55 +219,7 @@ class TestHistoryReconstruction:
 		After a tool-using turn, history should be reconstructed
 		in OpenAI's expected format for the next turn.
 		"""
-		# Create conversation and messages directly in DB
-		conv = Conversation(title="History Test")
-		db_session.add(conv)
-		await db_session.commit()
-		await db_session.refresh(conv)
-
-		# User message
-		user_msg = Message(
-			conversation_id=conv.id,
-			role=MessageRole.USER,
-			content="Search for cats",
-		)
-		db_session.add(user_msg)
-		await db_session.commit()
-
-		# Assistant message with tool traces
-		assistant_msg = Message(
-			conversation_id=conv.id,
-			role=MessageRole.ASSISTANT,
-			content="Cats are wonderful pets.",
-		)
-		db_session.add(assistant_msg)
-		await db_session.commit()
-		await db_session.refresh(assistant_msg)
-
-		# Add traces
-		traces = [
-			TraceLog(
-				message_id=assistant_msg.id,
-				type="thought",
-				content="Let me search for that.",
-			),
-			TraceLog(
-				message_id=assistant_msg.id,
-				type="tool_call",
-				tool_name="search",
-				tool_call_id="call_123",
-				tool_args={"query": "cats"},
-			),
-			TraceLog(
-				message_id=assistant_msg.id,
-				type="tool_result",
-				tool_name="search",
-				tool_call_id="call_123",
-				content="Cats are domesticated felines...",
-			),
-		]
-		db_session.add_all(traces)
-		await db_session.commit()
+		conv = await build_tool_turn(db_session)
 
 		# Reconstruct history
 		memory = MemoryService(db_session)
@@ -306,11 +242,11 @@ class TestHistoryReconstruction:
 
 		# Tool result
 		assert history[2]["role"] == "tool"
-		assert history[2]["tool_call_id"] == "call_123"
+		assert history[2]["tool_call_id"] == "call_1"
 
 		# Final answer
 		assert history[3]["role"] == "assistant"
-		assert history[3]["content"] == "Cats are wonderful pets."
+		assert history[3]["content"] == "Cats are great."
 
 
 class TestErrorHandling:
@@ -318,47 +254,30 @@ class TestErrorHandling:
 
 	@pytest.mark.asyncio
 	async def test_agent_error_event_persisted(
-		self, test_client: AsyncClient, db_session: AsyncSession
+		self,
+		chat_service: ChatService,
+		db_session: AsyncSession,
+		make_stub_agent,
 	):
 		"""
 		Error events from agents should be persisted as traces.
 		"""
-		create_response = await test_client.post(
-			"/api/conversations",
-			json={"title": "Error Test"},
-		)
-		conv_id = create_response.json()["id"]
-
-		mock_agent = MagicMock()
+		conv = await chat_service.create_conversation(title="Error Test")
+		conv_id = conv.id
 
 		async def mock_process_turn(*args, **kwargs):
 			yield AgentEvent(type="error", content="Something went wrong!")
 			yield AgentEvent(type="answer", content="I encountered an error.")
 
-		mock_agent.process_turn = mock_process_turn
-		mock_agent.name = "ErrorAgent"
+		mock_agent = make_stub_agent("ErrorAgent", mock_process_turn)
+		chat_service.agents = {"default": mock_agent}
 
-		with patch.dict(
-			"app.services.chat_service.AGENTS",
-			{"default": mock_agent},
-		):
-			response = await test_client.post(
-				f"/api/chat/{conv_id}/message",
-				json={"content": "Trigger error", "agent_id": "default"},
-			)
-
-		assert response.status_code == 200
+		await _run_turn(chat_service, conv_id, "Trigger error")
 
 		# Verify error trace persisted
-		result = await db_session.execute(
-			select(Message)
-			.options(selectinload(Message.traces))
-			.where(Message.conversation_id == conv_id)
-			.where(Message.role == MessageRole.ASSISTANT)
-		)
-		assistant_msg = result.scalars().first()
+		traces = await _assistant_traces(db_session, conv_id)
 
-		error_traces = [t for t in assistant_msg.traces if t.type == "error"]
+		error_traces = [t for t in traces if t.type == "error"]
 		assert len(error_traces) == 1
 		assert "Something went wrong" in error_traces[0].content
 
@@ -378,7 +297,6 @@ class TestCitationFlow:
 		conv = Conversation(title="Citation Test")
 		db_session.add(conv)
 		await db_session.commit()
-		await db_session.refresh(conv)
 
 		# Create assistant placeholder
 		memory = MemoryService(db_session)
@@ -445,11 +363,14 @@ class TestDummyAgentIntegration:
 
 	@pytest.mark.asyncio
 	async def test_dummy_agent_full_flow(
-		self, test_client: AsyncClient, db_session: AsyncSession
+		self,
+		test_client: AsyncClient,
+		db_session: AsyncSession,
+		override_dependency,
 	):
 		"""
 		Use the actual DummyAgent to verify full integration.
-		Note: This test has a 5+ second delay due to DummySearchTool's sleep.
+		DummySearchTool doesn't sleep here: conftest sets DUMMY_SLEEP_SECONDS=0.
 		"""
 		# Create conversation
 		create_response = await test_client.post(
@@ -458,43 +379,27 @@ class TestDummyAgentIntegration:
 		)
 		conv_id = create_response.json()["id"]
 
-		# Use the real dummy agent (faster tool mock)
-		from app.agents.examples.dummy_agent import DummyAgent
-		from app.agents.tools.base import BaseTool
-		from pydantic import BaseModel
-
-		class FastSearchTool(BaseTool):
-			name = "search_tool"
-			description = "Fast search for testing"
-
-			class Input(BaseModel):
-				query: str
-
-			input_schema = Input
-
-			async def run(self, context, query: str):
-				return f"Fast results for '{query}'"
-
+		# Use the real dummy agent and its real search tool
 		test_agent = DummyAgent(
-			name="Fast Dummy",
-			description="Fast test agent",
-			tools=[FastSearchTool()],
+			name="Dummy",
+			description="Test agent",
+			tools=[DummySearchTool()],
 		)
 
-		with patch.dict(
-			"app.services.chat_service.AGENTS",
-			{"dummy": test_agent},
-		):
-			response = await test_client.post(
-				f"/api/chat/{conv_id}/message",
-				json={"content": "Test query", "agent_id": "dummy"},
-			)
+		override_dependency(
+			get_agents, lambda: {**get_agents(), "dummy": test_agent}
+		)
+		response = await test_client.post(
+			f"/api/chat/{conv_id}/message",
+			json={"content": "Test query", "agent_id": "dummy"},
+		)
 
 		assert response.status_code == 200
 
-		# Parse events
-		lines = response.text.strip().split("\n")
-		events = [json.loads(line) for line in lines]
+		# Parse events (json.loads takes the raw bytes, no text decode)
+		events = [
+			json.loads(line) for line in response.content.split(b"\n") if line
+		]
 
 		event_types = [e["type"] for e in events]
 
@@ -527,51 +432,36 @@ class TestConversationDeletion:
 
 	@pytest.mark.asyncio
 	async def test_delete_conversation_removes_messages_and_traces(
-		self, test_client: AsyncClient, db_session: AsyncSession
+		self,
+		chat_service: ChatService,
+		db_session: AsyncSession,
+		make_stub_agent,
 	):
 		"""
 		Deleting a conversation should cascade delete all related data.
 		"""
 		# Create conversation with messages
-		create_response = await test_client.post(
-			"/api/conversations",
-			json={"title": "To Delete"},
-		)
-		conv_id = create_response.json()["id"]
-
-		mock_agent = MagicMock()
+		conv = await chat_service.create_conversation(title="To Delete")
+		conv_id = conv.id
 
 		async def mock_process_turn(*args, **kwargs):
 			yield AgentEvent(type="thought", content="Thinking...")
 			yield AgentEvent(type="answer", content="Done!")
 
-		mock_agent.process_turn = mock_process_turn
-		mock_agent.name = "TestAgent"
+		mock_agent = make_stub_agent("TestAgent", mock_process_turn)
+		chat_service.agents = {"default": mock_agent}
 
-		with patch.dict(
-			"app.services.chat_service.AGENTS",
-			{"default": mock_agent},
-		):
-			await test_client.post(
-				f"/api/chat/{conv_id}/message",
-				json={"content": "Hello", "agent_id": "default"},
-			)
+		await _run_turn(chat_service, conv_id, "Hello")
 
 		# Verify data exists
-		result = await db_session.execute(
-			select(Message).where(Message.conversation_id == conv_id)
-		)
-		messages_before = result.scalars().all()
-		assert len(messages_before) == 2
+		assert await _message_count(db_session, conv_id) == 2
 
 		# Delete conversation
-		delete_response = await test_client.delete(
-			f"/api/conversations/{conv_id}"
-		)
-		assert delete_response.status_code == 200
+		assert await chat_service.delete_conversation(conv_id) is True
 
 		# Verify conversation gone
 		result = await db_session.execute(
 			select(Conversation).where(Conversation.id == conv_id)
 		)
 		assert result.scalars().first() is None
+		assert await _message_count(db_session, conv_id) == 0
@@ -1,3 +1,5 @@
+from datetime import datetime, timezone
+
 import pytest
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
@@ -11,6 +13,7 @@ from app.models.chat import (
 	Citation,
 )
 from app.schemas.chat import ConversationDetail
+from app.schemas.chat import TraceLog as TraceLogSchema
 
 
 @pytest.mark.asyncio
@@ -21,37 +24,32 @@ async def test_conversation_detail_serializes_with_null_citation_source_metadata
 	Regression: older DB rows can store JSON `null` for citations.source_metadata.
 	FastAPI/Pydantic serialization should not fail when loading a conversation.
 	"""
-	conv = Conversation(title="Has citations")
-	db_session.add(conv)
-	await db_session.commit()
-	await db_session.refresh(conv)
-
-	assistant = Message(
-		conversation_id=conv.id,
-		role=MessageRole.ASSISTANT,
-		content="Answer with sources",
-	)
-	db_session.add(assistant)
-	await db_session.commit()
-	await db_session.refresh(assistant)
-
-	trace = TraceLog(
-		message_id=assistant.id,
-		type="citations",
-		content="Citations generated.",
-	)
-	db_session.add(trace)
-	await db_session.commit()
-	await db_session.refresh(trace)
-
-	citation = Citation(
-		trace_id=trace.id,
-		source_type="website",
-		title="Example",
-		url="https://example.com",
-		source_metadata=None,  # critical: should serialize as {}
+	# Build the whole graph and write it in one commit
+	conv = Conversation(
+		title="Has citations",
+		messages=[
+			Message(
+				role=MessageRole.ASSISTANT,
+				content="Answer with sources",
+				traces=[
+					TraceLog(
+						type="citations",
+						content="Citations generated.",
+						citations=[
+							Citation(
+								source_type="website",
+								title="Example",
+								url="https://example.com",
+								# critical: should serialize as {}
+								source_metadata=None,
+							)
+						],
+					)
+				],
+			)
+		],
 	)
-	db_session.add(citation)
+	db_session.add(conv)
 	await db_session.commit()
 
 	# Reload with relationships like ChatService.get_conversation()
@@ -73,3 +71,41 @@ async def test_conversation_detail_serializes_with_null_citation_source_metadata
 	assert serialized.messages[0].traces
 	assert serialized.messages[0].traces[0].citations
 	assert serialized.messages[0].traces[0].citations[0].source_metadata == {}
+
+
+def test_trace_log_schema_decodes_stored_tool_args():
+	"""tool_args are stored as a JSON string but exposed to clients as an object."""
+	trace = TraceLog(
+		id="t1",
+		message_id="m1",
+		type="tool_call",
+		tool_name="search",
+		tool_args='{"query": "cats"}',
+		timestamp=datetime.now(timezone.utc),
+	)
+
+	serialized = TraceLogSchema.model_validate(trace, from_attributes=True)
+	assert serialized.tool_args_raw == '{"query": "cats"}'
+	assert serialized.tool_args == {"query": "cats"}
+
+	# Clients only ever see the decoded object
+	dumped = serialized.model_dump()
+	assert dumped["tool_args"] == {"query": "cats"}
+	assert "tool_args_raw" not in dumped
+
+
+@pytest.mark.parametrize("stored", ["{not json", '["a", "b"]', "42"])
+def test_trace_log_schema_tolerates_non_object_tool_args(stored: str):
+	"""A malformed or non-object tool_args row serializes as None, not a 500."""
+	trace = TraceLog(
+		id="t1",
+		message_id="m1",
+		type="tool_call",
+		tool_name="search",
+		tool_args=stored,
+		timestamp=datetime.now(timezone.utc),
+	)
+
+	serialized = TraceLogSchema.model_validate(trace, from_attributes=True)
+	assert serialized.tool_args is None
+	assert serialized.model_dump()["tool_args"] is None
@@ -1,9 +1,13 @@
+import asyncio
 import json
-from unittest.mock import patch, MagicMock
+import anyio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch, MagicMock
 import pytest
+from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.services.chat_service import ChatService
+from app.services.chat_service import ChatService, update_conversation_title
 from app.schemas.chat import ChatRequest
 from app.agents.models import AgentEvent
 from app.services.memory_service import MemoryService
@@ -63,7 +67,7 @@ async def test_delete_conversation(db_session: AsyncSession):
 
 
 @pytest.mark.asyncio
-async def test_process_message_flow(db_session: AsyncSession):
+async def test_process_message_flow(db_session: AsyncSession, make_stub_agent):
 	"""
 	Verify the full process_message flow:
 	1. User message created
@@ -72,14 +76,6 @@ async def test_process_message_flow(db_session: AsyncSession):
 	4. Answer yielded
 	5. Assistant message finalized
 	"""
-	service = ChatService(db_session)
-	conv = await service.create_conversation("Flow Test")
-
-	# Mock the AGENTS dictionary and the agent instance
-	# We use MagicMock because AsyncMock would make process_turn return a coroutine
-	# but we need it to return an async generator immediately for 'async for'
-	mock_agent = MagicMock()
-
 	# Define events the agent yields
 	events = [
 		AgentEvent(type="thought", content="Thinking..."),
@@ -90,34 +86,249 @@ async def test_process_message_flow(db_session: AsyncSession):
 		for e in events:
 			yield e
 
-	mock_agent.process_turn.side_effect = event_generator
+	# Stub agent whose process_turn returns the async generator directly
+	mock_agent = make_stub_agent("FlowAgent", event_generator)
 
-	with patch.dict(
-		"app.services.chat_service.AGENTS", {"default": mock_agent}
-	):
-		request = ChatRequest(agent_id="default", content="Hello agent")
+	service = ChatService(db_session, agents={"default": mock_agent})
+	conv = await service.create_conversation("Flow Test")
+	request = ChatRequest(agent_id="default", content="Hello agent")
+
+	# Collect yielded strings (json lines)
+	yielded_lines = []
+	async for line in service.process_message(conv.id, request):
+		yielded_lines.append(line)
+
+	# Check partial JSON outputs
+	parsed_events = [json.loads(line) for line in yielded_lines]
+	assert len(parsed_events) == 2
+	assert parsed_events[0]["type"] == "thought"
+	assert parsed_events[0]["content"] == "Thinking..."
+	assert parsed_events[1]["type"] == "answer"
+	assert parsed_events[1]["content"] == "Hello world"
+
+	# Verify DB state
+	mem_service = MemoryService(db_session)
+	history = await mem_service.get_openai_history(conv.id)
+
+	# Should have User message and Assistant message with content
+	assert len(history) == 2
+	assert history[0]["role"] == "user"
+	assert history[0]["content"] == "Hello agent"
+
+	assert history[1]["role"] == "assistant"
+	assert history[1]["content"] == "Hello world"
+
+
+@pytest.mark.asyncio
+async def test_process_message_reraises_agent_error(
+	db_session: AsyncSession, make_stub_agent
+):
+	"""An agent failure mid-stream surfaces in the response generator."""
+
+	async def failing_generator(*args, **kwargs):
+		yield AgentEvent(type="thought", content="Thinking...")
+		raise RuntimeError("agent crashed")
+
+	mock_agent = make_stub_agent("FailingAgent", failing_generator)
+
+	service = ChatService(db_session, agents={"default": mock_agent})
+	conv = await service.create_conversation("Error Test")
+	request = ChatRequest(agent_id="default", content="Hello agent")
+	stream = service.process_message(conv.id, request)
+
+	first = json.loads(await anext(stream))
+	assert first["type"] == "thought"
+	with pytest.raises(RuntimeError, match="agent crashed"):
+		await anext(stream)
+
+	# What was streamed before the failure is still persisted
+	db_session.expunge_all()
+	fetched = await service.get_conversation(conv.id)
+	assistant = fetched.messages[-1]
+	assert [t.content for t in assistant.traces] == ["Thinking..."]
 
-		# Collect yielded strings (json lines)
-		yielded_lines = []
+
+@pytest.mark.asyncio
+async def test_process_message_persists_partial_turn_on_disconnect(
+	db_session: AsyncSession, make_stub_agent
+):
+	"""Closing the stream early keeps the traces and partial answer."""
+
+	async def endless_generator(*args, **kwargs):
+		yield AgentEvent(type="thought", content="Thinking...")
+		yield AgentEvent(type="answer", content="Partial")
+		while True:
+			yield AgentEvent(type="answer", content=" more")
+
+	mock_agent = make_stub_agent("EndlessAgent", endless_generator)
+
+	service = ChatService(db_session, agents={"default": mock_agent})
+	conv = await service.create_conversation("Disconnect Test")
+	request = ChatRequest(agent_id="default", content="Hello agent")
+	stream = service.process_message(conv.id, request)
+
+	await anext(stream)
+	await anext(stream)
+	# The client goes away: the response closes the generator
+	await stream.aclose()
+
+	db_session.expunge_all()
+	fetched = await service.get_conversation(conv.id)
+	assistant = fetched.messages[-1]
+	assert assistant.content == "Partial"
+	assert [t.type for t in assistant.traces] == ["thought"]
+
+
+@pytest.mark.asyncio
+async def test_process_message_persists_partial_turn_when_cancelled(
+	db_session: AsyncSession, make_stub_agent
+):
+	"""
+	A disconnect on ASGI servers below spec 2.4 makes Starlette cancel the
+	task group streaming the response; the partial turn is still saved.
+	"""
+	answered = asyncio.Event()
+
+	async def hanging_generator(*args, **kwargs):
+		yield AgentEvent(type="thought", content="Thinking...")
+		yield AgentEvent(type="answer", content="Partial")
+		await asyncio.Event().wait()
+
+	mock_agent = make_stub_agent("HangingAgent", hanging_generator)
+
+	service = ChatService(db_session, agents={"default": mock_agent})
+	conv = await service.create_conversation("Cancel Test")
+	request = ChatRequest(agent_id="default", content="Hello agent")
+
+	async def consume():
 		async for line in service.process_message(conv.id, request):
-			yielded_lines.append(line)
-
-		# Check partial JSON outputs
-		parsed_events = [json.loads(line) for line in yielded_lines]
-		assert len(parsed_events) == 2
-		assert parsed_events[0]["type"] == "thought"
-		assert parsed_events[0]["content"] == "Thinking..."
-		assert parsed_events[1]["type"] == "answer"
-		assert parsed_events[1]["content"] == "Hello world"
-
-		# Verify DB state
-		mem_service = MemoryService(db_session)
-		history = await mem_service.get_openai_history(conv.id)
-
-		# Should have User message and Assistant message with content
-		assert len(history) == 2
-		assert history[0]["role"] == "user"
-		assert history[0]["content"] == "Hello agent"
-
-		assert history[1]["role"] == "assistant"
-		assert history[1]["content"] == "Hello world"
+			if json.loads(line)["type"] == "answer":
+				answered.set()
+
+	async with anyio.create_task_group() as tg:
+		tg.start_soon(consume)
+		await answered.wait()
+		tg.cancel_scope.cancel()
+
+	db_session.expunge_all()
+	fetched = await service.get_conversation(conv.id)
+	assistant = fetched.messages[-1]
+	assert assistant.content == "Partial"
+	assert [t.type for t in assistant.traces] == ["thought"]
+
+
+@pytest.mark.asyncio
+async def test_process_message_stamps_traces_when_buffered(
+	db_session: AsyncSession, make_stub_agent
+):
+	"""
+	Traces carry the time their event was streamed, not the time of the
+	end-of-turn flush, and keep their order.
+	"""
+	release = asyncio.Event()
+
+	async def waiting_generator(*args, **kwargs):
+		yield AgentEvent(type="thought", content="first")
+		yield AgentEvent(type="thought", content="second")
+		await release.wait()
+		yield AgentEvent(type="answer", content="Done")
+
+	mock_agent = make_stub_agent("WaitingAgent", waiting_generator)
+
+	service = ChatService(db_session, agents={"default": mock_agent})
+	conv = await service.create_conversation("Timestamp Test")
+	request = ChatRequest(agent_id="default", content="Hello agent")
+	stream = service.process_message(conv.id, request)
+
+	await anext(stream)
+	await anext(stream)
+	# Both traces are buffered before this point; the flush comes after
+	seen = datetime.now(timezone.utc).replace(tzinfo=None)
+	await asyncio.sleep(0.01)
+	release.set()
+	async for _ in stream:
+		pass
+
+	db_session.expunge_all()
+	fetched = await service.get_conversation(conv.id)
+	traces = fetched.messages[-1].traces
+	assert [t.content for t in traces] == ["first", "second"]
+	stamps = [t.timestamp.replace(tzinfo=None) for t in traces]
+	assert stamps[0] < stamps[1] <= seen
+
+
+@pytest.mark.asyncio
+async def test_get_conversations_keyset_pagination(db_session: AsyncSession):
+	service = ChatService(db_session)
+	for i in range(5):
+		await service.create_conversation(f"Chat {i}")
+
+	first_page = await service.get_conversations(limit=2)
+	assert len(first_page) == 2
+
+	last = first_page[-1]
+	rest = await service.get_conversations(
+		limit=10, before=last.updated_at, before_id=last.id
+	)
+	assert len(rest) == 3
+
+	# Pages never overlap and together cover every conversation
+	ids = [c.id for c in first_page] + [c.id for c in rest]
+	assert len(set(ids)) == 5
+
+
+@pytest.mark.asyncio
+async def test_get_conversations_raises_on_lazy_load(db_session: AsyncSession):
+	service = ChatService(db_session)
+	await service.create_conversation("Chat")
+	db_session.expunge_all()
+
+	convs = await service.get_conversations()
+
+	# List queries never load messages; touching them must fail loudly
+	# instead of issuing one lazy query per conversation.
+	with pytest.raises(InvalidRequestError):
+		_ = convs[0].messages
+
+
+@pytest.mark.asyncio
+async def test_update_conversation_title_writes_generated_title(
+	db_session: AsyncSession,
+):
+	service = ChatService(db_session)
+	conv = await service.create_conversation("New Chat")
+
+	client = MagicMock()
+	client.chat.completions.create = AsyncMock(
+		return_value=MagicMock(
+			choices=[MagicMock(message=MagicMock(content=" Python basics \n"))]
+		)
+	)
+
+	with (
+		patch(
+			"app.services.chat_service.get_title_client", return_value=client
+		),
+		patch(
+			"app.services.chat_service.SessionLocal",
+			lambda: AsyncSession(db_session.bind),
+		),
+	):
+		await update_conversation_title(conv.id, "What is Python?")
+
+	await db_session.refresh(conv)
+	assert conv.title == "Python basics"
+
+
+@pytest.mark.asyncio
+async def test_get_conversations_list_returns_projection(
+	db_session: AsyncSession,
+):
+	service = ChatService(db_session)
+	older = await service.create_conversation("Older")
+	newer = await service.create_conversation("Newer")
+
+	rows = await service.get_conversations_list(limit=10)
+
+	assert {r.id for r in rows} == {newer.id, older.id}
+	assert set(rows[0]._mapping) == {"id", "title", "updated_at", "status"}
@@ -13,13 +13,13 @@ from app.models.chat import (
 )
 from app.services.memory_service import MemoryService
 from app.agents.models import AgentEvent, CitationEvent, CitationItem
+from tests.factories import build_tool_turn
 
 
 async def _create_conversation(session: AsyncSession) -> Conversation:
 	conv = Conversation(title="Test")
 	session.add(conv)
 	await session.commit()
-	await session.refresh(conv)
 	return conv
 
 
@@ -52,50 +52,15 @@ async def test_get_openai_history_simple_user_and_assistant(
 
 
 @pytest.mark.asyncio
-async def test_get_openai_history_tool_call_roundtrip(db_session: AsyncSession):
-	conv = await _create_conversation(db_session)
-
-	# user message
-	user = Message(
-		conversation_id=conv.id,
-		role=MessageRole.USER,
-		content="Search for cats",
-	)
-
-	# assistant message with traces representing tool calling + final answer
-	assistant = Message(
-		conversation_id=conv.id,
-		role=MessageRole.ASSISTANT,
-		content="Cats are great.",
-	)
-	db_session.add_all([user, assistant])
-	await db_session.commit()
-	await db_session.refresh(assistant)
-
-	trace_thought = TraceLog(
-		message_id=assistant.id,
-		type="thought",
-		content="Let me search that.",
-	)
-	trace_call = TraceLog(
-		message_id=assistant.id,
-		type="tool_call",
-		tool_name="search",
-		tool_call_id="call_1",
-		tool_args={"q": "cats"},
-	)
-	trace_result = TraceLog(
-		message_id=assistant.id,
-		type="tool_result",
-		tool_name="search",
-		tool_call_id="call_1",
-		content="Result: cats...",
-	)
-	db_session.add_all([trace_thought, trace_call, trace_result])
-	await db_session.commit()
+async def test_get_openai_history_tool_call_roundtrip(
+	db_session: AsyncSession, count_queries
+):
+	conv = await build_tool_turn(db_session)
 
 	mem = MemoryService(db_session)
-	history = await mem.get_openai_history(conv.id)
+	with count_queries() as statements:
+		history = await mem.get_openai_history(conv.id)
+	assert len(statements) == 2
 
 	assert history[0] == {"role": "user", "content": "Search for cats"}
 
@@ -125,6 +90,31 @@ async def test_get_openai_history_tool_call_roundtrip(db_session: AsyncSession):
 	assert history[3] == {"role": "assistant", "content": "Cats are great."}
 
 
+@pytest.mark.asyncio
+async def test_iter_openai_history_streams_and_can_stop_early(
+	db_session: AsyncSession,
+):
+	conv = await build_tool_turn(db_session)
+	user_id = conv.messages[0].id
+	mem = MemoryService(db_session)
+
+	roles = [
+		m["role"]
+		async for m in mem.iter_openai_history(
+			conv.id, exclude_message_ids={user_id}
+		)
+	]
+	assert roles == ["assistant", "tool", "assistant"]
+
+	# Abandoning the stream after the first message closes the result
+	stream = mem.iter_openai_history(conv.id)
+	assert await anext(stream) == {"role": "user", "content": "Search for cats"}
+	await stream.aclose()
+
+	# The session is still usable afterwards
+	assert len(await mem.get_openai_history(conv.id)) == 4
+
+
 @pytest.mark.asyncio
 async def test_exclude_message_ids_and_persistence_helpers(
 	db_session: AsyncSession,
@@ -158,6 +148,47 @@ async def test_exclude_message_ids_and_persistence_helpers(
 	assert history2[-1] == {"role": "assistant", "content": "Done."}
 
 
+@pytest.mark.asyncio
+async def test_message_helpers_do_not_reload_after_commit(
+	db_session: AsyncSession, count_queries
+):
+	conv = await _create_conversation(db_session)
+	mem = MemoryService(db_session)
+
+	with count_queries() as statements:
+		user_msg = await mem.create_user_message(
+			conversation_id=conv.id, content="Hi"
+		)
+		assistant_msg = await mem.create_assistant_placeholder(
+			conversation_id=conv.id
+		)
+
+	# Ids are generated client-side: one INSERT each, no SELECT afterwards
+	assert [st.split()[0] for st in statements] == ["INSERT", "INSERT"]
+	assert user_msg.id and assistant_msg.id
+
+
+@pytest.mark.asyncio
+async def test_begin_turn_persists_both_messages(db_session: AsyncSession):
+	conv = await _create_conversation(db_session)
+	mem = MemoryService(db_session)
+
+	user_msg, assistant_msg = await mem.begin_turn(
+		conversation_id=conv.id, user_content="Hi"
+	)
+	await mem.finalize_assistant_message(
+		assistant_message_id=assistant_msg.id, content="Hello!"
+	)
+
+	# Both rows are durable and ordered user -> assistant
+	history = await mem.get_openai_history(conv.id)
+	assert history == [
+		{"role": "user", "content": "Hi"},
+		{"role": "assistant", "content": "Hello!"},
+	]
+	assert user_msg.created_at < assistant_msg.created_at
+
+
 # ============================================================
 # NEW TESTS: Edge Cases and Additional Coverage
 # ============================================================
@@ -187,65 +218,57 @@ async def test_get_openai_history_nonexistent_conversation(
 
 
 @pytest.mark.asyncio
-async def test_multiple_tool_calls_in_single_turn(db_session: AsyncSession):
+async def test_multiple_tool_calls_in_single_turn(
+	db_session: AsyncSession, count_queries
+):
 	"""Multiple tool calls in one turn are reconstructed correctly in OpenAI format."""
-	conv = await _create_conversation(db_session)
-
-	user = Message(
-		conversation_id=conv.id,
-		role=MessageRole.USER,
-		content="Search for cats and dogs",
-	)
-	assistant = Message(
-		conversation_id=conv.id,
-		role=MessageRole.ASSISTANT,
-		content="Here's what I found about cats and dogs.",
-	)
-	db_session.add_all([user, assistant])
-	await db_session.commit()
-	await db_session.refresh(assistant)
-
+	user = Message(role=MessageRole.USER, content="Search for cats and dogs")
 	# Two tool calls in the same turn
 	traces = [
 		TraceLog(
-			message_id=assistant.id,
 			type="thought",
 			content="I'll search for both.",
 		),
 		TraceLog(
-			message_id=assistant.id,
 			type="tool_call",
 			tool_name="search",
 			tool_call_id="call_cats",
-			tool_args={"query": "cats"},
+			tool_args=json.dumps({"query": "cats"}),
 		),
 		TraceLog(
-			message_id=assistant.id,
 			type="tool_call",
 			tool_name="search",
 			tool_call_id="call_dogs",
-			tool_args={"query": "dogs"},
+			tool_args=json.dumps({"query": "dogs"}),
 		),
 		TraceLog(
-			message_id=assistant.id,
 			type="tool_result",
 			tool_name="search",
 			tool_call_id="call_cats",
 			content="Cats are felines...",
 		),
 		TraceLog(
-			message_id=assistant.id,
 			type="tool_result",
 			tool_name="search",
 			tool_call_id="call_dogs",
 			content="Dogs are canines...",
 		),
 	]
-	db_session.add_all(traces)
+	assistant = Message(
+		role=MessageRole.ASSISTANT,
+		content="Here's what I found about cats and dogs.",
+		traces=traces,
+	)
+	# Conversation, messages and traces go in with a single commit
+	conv = Conversation(title="Test", messages=[user, assistant])
+	db_session.add(conv)
 	await db_session.commit()
 
 	mem = MemoryService(db_session)
-	history = await mem.get_openai_history(conv.id)
+	with count_queries() as statements:
+		history = await mem.get_openai_history(conv.id)
+	# Messages plus their traces, eager-loaded: no per-message queries
+	assert len(statements) == 2
 
 	# Structure: user, assistant(tool_calls), tool, tool, assistant(answer)
 	assert history[0]["role"] == "user"
@@ -388,7 +411,7 @@ async def test_append_trace_with_all_tool_fields(db_session: AsyncSession):
 	assert trace.content == "Calling search tool"
 	assert trace.tool_name == "advanced_search"
 	assert trace.tool_call_id == "call_xyz789"
-	assert trace.tool_args == {
+	assert json.loads(trace.tool_args) == {
 		"query": "test query",
 		"limit": 10,
 		"filters": {"type": "pdf"},
@@ -428,3 +451,89 @@ async def test_append_trace_tool_result_with_all_fields(
 	assert trace.content == "Found 5 documents matching your query."
 	assert trace.tool_name == "advanced_search"
 	assert trace.tool_call_id == "call_xyz789"
+
+
+@pytest.mark.asyncio
+async def test_append_traces_persists_batch_with_citations(
+	db_session: AsyncSession, count_queries
+):
+	"""append_traces stores every event (incl. citations) in one call."""
+	conv = await _create_conversation(db_session)
+	mem = MemoryService(db_session)
+
+	assistant_msg = await mem.create_assistant_placeholder(
+		conversation_id=conv.id
+	)
+
+	with count_queries() as statements:
+		await mem.append_traces(
+			assistant_message_id=assistant_msg.id,
+			events=[
+				AgentEvent(type="thought", content="Thinking..."),
+				AgentEvent(
+					type="tool_call",
+					content="Calling search",
+					tool_name="search",
+					tool_args={"q": "cats"},
+					tool_call_id="call_1",
+				),
+				CitationEvent(
+					content="Found sources",
+					citations=[
+						CitationItem(
+							source_type="pdf",
+							title="Paper",
+							gcs_path="gs://bucket/paper.pdf",
+						)
+					],
+				),
+			],
+		)
+
+	# The unit of work batches each table into one multi-row INSERT
+	inserts = [st for st in statements if st.startswith("INSERT")]
+	assert [st.split()[2] for st in inserts] == ["trace_logs", "citations"]
+
+	result = await db_session.execute(
+		select(TraceLog)
+		.options(selectinload(TraceLog.citations))
+		.where(TraceLog.message_id == assistant_msg.id)
+	)
+	traces = result.scalars().all()
+
+	assert sorted(t.type for t in traces) == [
+		"citations",
+		"thought",
+		"tool_call",
+	]
+	citation_trace = next(t for t in traces if t.type == "citations")
+	assert len(citation_trace.citations) == 1
+	assert citation_trace.citations[0].gcs_path == "gs://bucket/paper.pdf"
+
+
+@pytest.mark.asyncio
+async def test_finalize_assistant_message_with_buffered_traces(
+	db_session: AsyncSession,
+):
+	"""Final content and buffered traces are written together."""
+	conv = await _create_conversation(db_session)
+	mem = MemoryService(db_session)
+
+	assistant_msg = await mem.create_assistant_placeholder(
+		conversation_id=conv.id
+	)
+	await mem.finalize_assistant_message(
+		assistant_message_id=assistant_msg.id,
+		content="Done.",
+		events=[AgentEvent(type="thought", content="Thinking...")],
+	)
+
+	result = await db_session.execute(
+		select(Message)
+		.options(selectinload(Message.traces))
+		.where(Message.id == assistant_msg.id)
+	)
+	msg = result.scalars().first()
+
+	assert msg.content == "Done."
+	assert [t.type for t in msg.traces] == ["thought"]
@@ -1,8 +1,17 @@
-import pytest
-from unittest.mock import MagicMock
+import asyncio
+import datetime
 
-from app.services.storage_service import StorageService
+import pytest
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.services.storage_service import (
+	StorageService,
+	_load_credentials,
+	_storage_client,
+)
 from app.models.chat import Message, TraceLog, Citation, MessageRole
+from tests.factories import message_with_citations, pdf_citation, stub_signer
 
 
 @pytest.mark.asyncio
@@ -33,16 +42,7 @@ async def test_refresh_citations_signed_urls_overwrites_existing_signed_urls_for
 		url="https://example.com",
 		gcs_path=None,
 	)
-
-	trace = TraceLog(
-		message_id="m1", type="citations", content="c", citations=[c1, c2]
-	)
-	msg = Message(
-		conversation_id="conv1",
-		role=MessageRole.ASSISTANT,
-		content="hi",
-		traces=[trace],
-	)
+	msg = message_with_citations(c1, c2)
 
 	await service.refresh_citations_signed_urls([msg], expiration=123)
 
@@ -50,55 +50,70 @@ async def test_refresh_citations_signed_urls_overwrites_existing_signed_urls_for
 	assert c2.url == "https://example.com"
 
 
-def test_generate_signed_url_invalid_path_without_gs_prefix():
-	"""Returns None for paths that don't start with gs://."""
+@pytest.fixture(scope="module")
+def storage():
+	"""
+	Shared service for tests that only call generate_signed_url on paths it
+	rejects: nothing is signed, cached or stubbed on it.
+	"""
 	service = StorageService(project_id="test")
-
-	# These should all return None without attempting to sign
-	assert service.generate_signed_url("https://example.com/file.pdf") is None
-	assert service.generate_signed_url("bucket/path/to/file.pdf") is None
-	assert service.generate_signed_url("/local/path/file.pdf") is None
-	assert service.generate_signed_url("s3://bucket/file.pdf") is None
-	assert service.generate_signed_url("") is None
-
-
-def test_generate_signed_url_path_without_object():
+	yield service
+	service.close()
+
+
+@pytest.mark.parametrize(
+	"path",
+	[
+		"https://example.com/file.pdf",
+		"bucket/path/to/file.pdf",
+		"/local/path/file.pdf",
+		"s3://bucket/file.pdf",
+		"",
+	],
+)
+def test_generate_signed_url_invalid_path_without_gs_prefix(storage, path):
+	"""Returns None for paths that don't start with gs://."""
+	assert storage.generate_signed_url(path) is None
+
+
+@pytest.mark.parametrize(
+	"path",
+	[
+		# Just bucket name, no object path
+		"gs://bucket",
+		"gs://my-bucket",
+		# Edge case: trailing slash but no object
+		"gs://bucket/",
+	],
+)
+def test_generate_signed_url_path_without_object(storage, path):
 	"""Returns None when gs:// path has bucket but no object path."""
-	service = StorageService(project_id="test")
-
-	# Just bucket name, no object path
-	assert service.generate_signed_url("gs://bucket") is None
-	assert service.generate_signed_url("gs://my-bucket") is None
-
-	# Edge case: trailing slash but no object
-	# "gs://bucket/" splits to ["bucket", ""] which has len 2 but empty object
-	# This depends on implementation - let's verify behavior
-	result = service.generate_signed_url("gs://bucket/")  # noqa: F841
+	assert storage.generate_signed_url(path) is None
 
 
 def test_generate_signed_url_valid_path_structure():
-	"""Valid gs:// paths should attempt to generate signed URL (mocked)."""
+	"""Valid gs:// paths should attempt to generate signed URL (stubbed)."""
 	service = StorageService(project_id="test")
 
-	# Mock the client to avoid real GCP calls
-	mock_blob = MagicMock()
-	mock_blob.generate_signed_url.return_value = (
-		"https://signed-url.example.com"
-	)
-
-	mock_bucket = MagicMock()
-	mock_bucket.blob.return_value = mock_blob
-
-	mock_client = MagicMock()
-	mock_client.bucket.return_value = mock_bucket
+	# Stub credentials and the signer to avoid real GCP keys
+	credentials = object()
+	service._credentials = credentials
+	sign_calls = []
 
-	service._client = mock_client
+	def fake_sign_v4(credentials, **kwargs):
+		sign_calls.append((credentials, kwargs))
+		return "https://signed-url.example.com"
 
-	result = service.generate_signed_url("gs://my-bucket/path/to/file.pdf")
+	with patch(
+		"app.services.storage_service.generate_signed_url_v4", fake_sign_v4
+	):
+		result = service.generate_signed_url("gs://my-bucket/path/to/file.pdf")
 
 	assert result == "https://signed-url.example.com"
-	mock_client.bucket.assert_called_once_with("my-bucket")
-	mock_bucket.blob.assert_called_once_with("path/to/file.pdf")
+	assert len(sign_calls) == 1
+	signed_with, kwargs = sign_calls[0]
+	assert signed_with is credentials
+	assert kwargs["resource"] == "/my-bucket/path/to/file.pdf"
 
 
 @pytest.mark.asyncio
@@ -112,23 +127,10 @@ async def test_refresh_citations_handles_signing_exceptions():
 
 	service.generate_signed_url = failing_sign  # type: ignore[method-assign]
 
-	c1 = Citation(
-		trace_id="t1",
-		source_type="pdf",
-		title="Doc 1",
-		url="https://old-url.example",
-		gcs_path="gs://bucket/doc.pdf",
-	)
-
-	trace = TraceLog(
-		message_id="m1", type="citations", content="c", citations=[c1]
-	)
-	msg = Message(
-		conversation_id="conv1",
-		role=MessageRole.ASSISTANT,
-		content="hi",
-		traces=[trace],
+	c1 = pdf_citation(
+		"gs://bucket/doc.pdf", title="Doc 1", url="https://old-url.example"
 	)
+	msg = message_with_citations(c1)
 
 	# Should not raise - exception is caught and logged
 	await service.refresh_citations_signed_urls([msg])
@@ -188,48 +190,37 @@ async def test_refresh_citations_traces_without_citations():
 
 
 @pytest.mark.asyncio
-async def test_refresh_citations_multiple_messages_and_citations():
-	"""Multiple messages with multiple citations are all processed."""
+async def test_refresh_citations_website_only_skips_signing():
+	"""Citations without a gcs_path never reach the signer."""
 	service = StorageService(project_id="test")
+	sign_calls = stub_signer(service)
 
-	sign_calls = []
+	citation = Citation(
+		trace_id="t1",
+		source_type="website",
+		title="External",
+		url="https://example.com",
+		gcs_path=None,
+	)
+	msg = message_with_citations(citation)
 
-	def tracking_sign(gcs_path: str, expiration: int = 3600) -> str:
-		sign_calls.append(gcs_path)
-		return f"signed://{gcs_path}"
+	assert await service.refresh_citations_signed_urls([msg]) == [msg]
+	assert citation.url == "https://example.com"
+	assert sign_calls == []
 
-	service.generate_signed_url = tracking_sign  # type: ignore[method-assign]
 
-	# Message 1 with 2 GCS citations
-	c1 = Citation(
-		trace_id="t1", source_type="pdf", title="D1", gcs_path="gs://b/1.pdf"
-	)
-	c2 = Citation(
-		trace_id="t1", source_type="pdf", title="D2", gcs_path="gs://b/2.pdf"
-	)
-	trace1 = TraceLog(
-		message_id="m1", type="citations", content="c", citations=[c1, c2]
-	)
-	msg1 = Message(
-		conversation_id="conv1",
-		role=MessageRole.ASSISTANT,
-		content="a",
-		traces=[trace1],
-	)
+@pytest.mark.asyncio
+async def test_refresh_citations_multiple_messages_and_citations():
+	"""Multiple messages with multiple citations are all processed."""
+	service = StorageService(project_id="test")
+	sign_calls = stub_signer(service)
 
-	# Message 2 with 1 GCS citation
-	c3 = Citation(
-		trace_id="t2", source_type="pdf", title="D3", gcs_path="gs://b/3.pdf"
-	)
-	trace2 = TraceLog(
-		message_id="m2", type="citations", content="c", citations=[c3]
-	)
-	msg2 = Message(
-		conversation_id="conv1",
-		role=MessageRole.ASSISTANT,
-		content="b",
-		traces=[trace2],
-	)
+	# Message 1 with 2 GCS citations, message 2 with 1
+	c1 = pdf_citation("gs://b/1.pdf")
+	c2 = pdf_citation("gs://b/2.pdf")
+	c3 = pdf_citation("gs://b/3.pdf")
+	msg1 = message_with_citations(c1, c2)
+	msg2 = message_with_citations(c3)
 
 	await service.refresh_citations_signed_urls([msg1, msg2])
 
@@ -243,3 +234,171 @@ async def test_refresh_citations_multiple_messages_and_citations():
 	assert c1.url == "signed://gs://b/1.pdf"
 	assert c2.url == "signed://gs://b/2.pdf"
 	assert c3.url == "signed://gs://b/3.pdf"
+
+
+@pytest.mark.asyncio
+async def test_refresh_citations_reuses_cached_signed_urls():
+	"""A path signed once is served from the cache until near expiry."""
+	service = StorageService(project_id="test")
+	sign_calls = stub_signer(service)
+
+	c1 = pdf_citation("gs://b/1.pdf")
+	c2 = pdf_citation("gs://b/1.pdf")
+	await service.refresh_citations_signed_urls([message_with_citations(c1)])
+	await service.refresh_citations_signed_urls([message_with_citations(c2)])
+
+	assert sign_calls == ["gs://b/1.pdf"]
+	assert c1.url == c2.url == "signed://gs://b/1.pdf"
+
+	# Too short-lived to be worth caching: signed every time
+	for _ in range(2):
+		await service.refresh_citations_signed_urls(
+			[message_with_citations(pdf_citation("gs://b/1.pdf"))],
+			expiration=30,
+		)
+	assert len(sign_calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_refresh_citations_signs_each_unique_path_once():
+	"""Citations sharing a gcs_path in one batch trigger a single signing."""
+	service = StorageService(project_id="test")
+	sign_calls = stub_signer(service)
+
+	citations = [pdf_citation("gs://b/1.pdf") for _ in range(3)]
+	msg = message_with_citations(*citations)
+
+	await service.refresh_citations_signed_urls([msg])
+
+	assert sign_calls == ["gs://b/1.pdf"]
+	assert all(c.url == "signed://gs://b/1.pdf" for c in citations)
+
+
+def test_credentials_are_parsed_once_across_instances():
+	"""Service instances share parsed credentials for the same key."""
+	info = {"type": "service_account", "client_email": "sa@example.com"}
+	_load_credentials.cache_clear()
+
+	with (
+		patch.object(settings, "GCP_CREDENTIALS_JSON", info),
+		patch(
+			"app.services.storage_service.service_account.Credentials"
+			".from_service_account_info"
+		) as mock_parse,
+	):
+		first = StorageService(project_id="a").credentials
+		second = StorageService(project_id="b").credentials
+
+	_load_credentials.cache_clear()
+	assert first is second
+	mock_parse.assert_called_once_with(info)
+
+
+def test_direct_signing_matches_blob_generate_signed_url():
+	"""Direct V4 signing yields exactly the URL Blob.generate_signed_url does."""
+	serialization = pytest.importorskip(
+		"cryptography.hazmat.primitives.serialization"
+	)
+	rsa = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.rsa")
+
+	key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+	info = {
+		"type": "service_account",
+		"project_id": "test",
+		"private_key_id": "1",
+		"private_key": key.private_bytes(
+			serialization.Encoding.PEM,
+			serialization.PrivateFormat.PKCS8,
+			serialization.NoEncryption(),
+		).decode(),
+		"client_email": "signer@test.iam.gserviceaccount.com",
+		"client_id": "1",
+		"token_uri": "https://oauth2.googleapis.com/token",
+	}
+	_load_credentials.cache_clear()
+	_storage_client.cache_clear()
+
+	with (
+		patch.object(settings, "GCP_CREDENTIALS_JSON", info),
+		patch(
+			"google.cloud.storage._signing.get_v4_now_dtstamps",
+			return_value=("20260101T000000Z", "20260101"),
+		),
+	):
+		service = StorageService(project_id="test")
+		direct = service.generate_signed_url("gs://bucket/a dir/file~1.pdf")
+		via_blob = (
+			service.client.bucket("bucket")
+			.blob("a dir/file~1.pdf")
+			.generate_signed_url(
+				version="v4",
+				expiration=datetime.timedelta(seconds=3600),
+				method="GET",
+			)
+		)
+
+	_load_credentials.cache_clear()
+	_storage_client.cache_clear()
+	assert direct == via_blob
+
+
+@pytest.mark.asyncio
+async def test_prewarm_signed_urls_fills_cache_for_later_refresh():
+	"""Pre-warmed paths are served from the cache on the next refresh."""
+	service = StorageService(project_id="test")
+	sign_calls = stub_signer(service)
+
+	with patch.object(settings, "GCP_CREDENTIALS_JSON", {"type": "sa"}):
+		service.prewarm_signed_urls(["gs://b/1.pdf", "gs://b/1.pdf", None])
+		# Let the pool finish and the done-callback run on the loop
+		async with asyncio.timeout(2):
+			while not service._url_cache:
+				await asyncio.sleep(0.01)
+
+	c = pdf_citation("gs://b/1.pdf")
+	await service.refresh_citations_signed_urls([message_with_citations(c)])
+
+	assert sign_calls == ["gs://b/1.pdf"]
+	assert c.url == "signed://gs://b/1.pdf"
+
+
+@pytest.mark.asyncio
+async def test_sign_urls_preserves_order_and_maps_failures_to_none():
+	"""sign_urls returns one entry per input path, None where signing fails."""
+	service = StorageService(project_id="test")
+
+	def flaky_sign(gcs_path: str, expiration: int = 3600) -> str:
+		if gcs_path.endswith("bad.pdf"):
+			raise RuntimeError("boom")
+		return f"signed://{gcs_path}"
+
+	service.generate_signed_url = flaky_sign  # type: ignore[method-assign]
+
+	urls = await service.sign_urls(
+		["gs://b/2.pdf", "gs://b/bad.pdf", "gs://b/1.pdf", "gs://b/2.pdf"]
+	)
+
+	assert urls == [
+		"signed://gs://b/2.pdf",
+		None,
+		"signed://gs://b/1.pdf",
+		"signed://gs://b/2.pdf",
+	]
+
+
+@pytest.mark.asyncio
+async def test_urls_signed_for_new_citations_are_not_signed_again():
+	"""sign_urls, prewarm and refresh share one expiration, hence one key."""
+	service = StorageService(project_id="test")
+	sign_calls = stub_signer(service)
+
+	# As the RAG tool does when it builds citations
+	[url] = await service.sign_urls(["gs://b/1.pdf"])
+	with patch.object(settings, "GCP_CREDENTIALS_JSON", {"type": "sa"}):
+		service.prewarm_signed_urls(["gs://b/1.pdf"])
+
+	c = pdf_citation("gs://b/1.pdf")
+	await service.refresh_citations_signed_urls([message_with_citations(c)])
+
+	assert sign_calls == ["gs://b/1.pdf"]
+	assert c.url == url